@@ -1,53 +1,126 @@
 import requests
+from requests.adapters import HTTPAdapter
 import json
+import random
+import threading
+import time
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import os
+from draw_archive import open_archive, term_year
+from draw_store import DrawStore
+from draw_scheduler import TAIPEI
+
+class ResponseCache:
+    """API 原始回應的磁碟快取，每個 (年, 月) 一個檔案"""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, year, month):
+        return os.path.join(self.directory, f'{year}-{month:02d}.json')
+
+    def get(self, year, month):
+        try:
+            with open(self._path(year, month), 'r', encoding='utf-8') as fp:
+                return json.load(fp)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, year, month, content, immutable, etag=None, last_modified=None):
+        entry = {
+            'immutable': immutable,
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched_at': datetime.now().isoformat(timespec='seconds'),
+            'body': content.decode('utf-8')
+        }
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(year, month)
+        temp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as fp:
+            json.dump(entry, fp, ensure_ascii=False)
+        os.replace(temp_path, path)
 
 class LottoBase:
-    def __init__(self, api='https://api.taiwanlottery.com/TLCAPIWeB/Lottery/Lotto649Result'):
+    def __init__(self, api='https://api.taiwanlottery.com/TLCAPIWeB/Lottery/Lotto649Result', max_workers=8,
+                 timeout=(5, 30), max_retries=3, backoff=0.5, use_cache=True):
         self.api = api
+        # 同時抓取的月份數上限，設為 1 即依序抓取
+        self.max_workers = max_workers
+        # (連線逾時, 讀取逾時) 秒數、最多重試次數與重試的基本等待秒數
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
         self.default_dir = 'data'
         self.default_filename = 'Lotto.json'
-        self.draws = {}
+        self.result_key = 'lotto649Res'
+        # 每期的號碼個數與是否有特別號，決定封存檔的紀錄內容
+        self.numbers = 6
+        self.has_bonus = True
+        # 依期數排序的開獎資料，取得最新一期或範圍查詢不需重新排序
+        self.draws = DrawStore()
+        # 已載入 self.draws 的年份分片，其餘年份在需要時才讀取
+        self.loaded_years = set()
+        # 本次爬取新發現的期數（依解析順序），供增量寫入數據庫與資料檔
+        self.new_draws = []
+        self.use_cache = use_cache
+        self._run_responses = {}
+
+        # 共用的連線池，讓同一主機的請求可以重複使用連線
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, max_workers))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._stats_lock = threading.Lock()
+        self.resetStats()
+
+    @property
+    def cache(self):
+        # 快取目錄依各彩種的資料檔名區分
+        if not self.use_cache:
+            return None
+        name = os.path.splitext(self.default_filename)[0]
+        return ResponseCache(os.path.join(self.default_dir, 'cache', name))
+
+    @property
+    def archive(self):
+        # 依年份分片的封存目錄與 JSON 資料檔同名
+        name = os.path.splitext(self.default_filename)[0]
+        return open_archive(os.path.join(self.default_dir, name), self.numbers, self.has_bonus)
+
+    def crawl(self, force_update=False, until=None):
+        self.resetStats()
+        self._run_responses = {}
+        self.new_draws = []
+        try:
+            return self._crawl(force_update, until)
+        finally:
+            self.printStats()
 
-    def crawl(self, force_update=False):
+    def _crawl(self, force_update=False, until=None):
         lastest_draw = self.getLastDraw()
-        currentTime = datetime.now()
+        # 爬取到 until（預期的開獎時間）所在的月份，預設為目前月份，皆以台灣時間計算
+        currentTime = (until or datetime.now(TAIPEI)).astimezone(TAIPEI)
 
         print(f'最新一期: {lastest_draw["draw"] if lastest_draw else None}')
 
         if lastest_draw == None or force_update:
             ybegin, mbegin = (103, 1)
         else:
+            # 從最新一期所在的月份爬到目前月份，下一期落在之後的月份時也能取得
             ybegin = lastest_draw['year']
             mbegin = lastest_draw['month']
-            
-            current_month_data = self.crawlApi(ybegin, mbegin)
-            if current_month_data:
-                data = json.loads(current_month_data)
-                content = data.get("content", {})
-                latest_period = None
-                
-                if "lotto649Res" in content:
-                    draws = content["lotto649Res"]
-                elif "daily539Res" in content:
-                    draws = content["daily539Res"]
-                elif "superLotto638Res" in content:
-                    draws = content["superLotto638Res"]
-                
-                if draws and len(draws) > 0:
-                    latest_period = draws[0]["period"]
-                    
-                if latest_period and int(latest_period) <= int(lastest_draw['draw']):
-                    print('資料已是最新，無需更新')
-                    return self
-                else:
-                    print(f'發現新資料，最新期數: {latest_period}')
+            # 最新一期所在的月份即使已結束並存入快取，仍向伺服器確認，避免以快取判斷沒有新資料
+            self.crawlApi(ybegin, mbegin, revalidate=True)
 
         yend, mend = (currentTime.year - 1911, currentTime.month)
 
         print(f'開始爬取資料: 從 {ybegin}/{mbegin} 到 {yend}/{mend}')
 
+        months = []
         for y in range(ybegin, yend + 1):
             for m in range(1, 13):
                 if y == ybegin and m < mbegin:
@@ -55,88 +128,309 @@ class LottoBase:
                 elif y == yend and m > mend:
                     continue
 
-                self.crawlMonth(y, m)
+                months.append((y, m))
+
+        self.crawlMonths(months)
+
+        if lastest_draw != None and not force_update:
+            if self.new_draws:
+                print(f'發現新資料，最新期數: {self.getLastDraw()["draw"]}')
+            else:
+                print('資料已是最新，無需更新')
             
         return self
 
+    def repair(self):
+        # 只重新爬取缺少期數所在的月份，不需從頭完整爬取
+        self.resetStats()
+        self._run_responses = {}
+        self.new_draws = []
+        try:
+            gaps = self.archive.gaps()
+            # 已結束年份最後一期之後的月份，快取中已有月份結束後的完整回應時不需再確認
+            unconfirmed = [month for month in self.archive.trailing_months() if not self._confirmedMonth(*month)]
+            if not gaps and not unconfirmed:
+                print('沒有缺少的期數')
+                return self
+
+            missing = sorted({term for terms in gaps.values() for term in terms})
+            if missing:
+                print(f'缺少 {len(missing)} 期: {", ".join(missing)}')
+            if gaps:
+                # 整年缺少的期數無法由期數得知，這些月份同樣重新爬取確認
+                print(f'重新爬取 {len(gaps)} 個可能有缺漏的月份')
+            if unconfirmed:
+                print(f'確認 {len(unconfirmed)} 個年底月份是否有未取得的期數')
+            self.crawlMonths(sorted(set(gaps) | set(unconfirmed)))
+
+            found = {draw['draw'] for draw in self.new_draws}
+            print(f'補回 {len(found)} 期')
+            still_missing = [term for term in missing if term not in found]
+            if still_missing:
+                print(f'仍然缺少 {len(still_missing)} 期: {", ".join(still_missing)}')
+            return self
+        finally:
+            self.printStats()
+
+    def _confirmedMonth(self, year, month):
+        # 月份結束後取得的回應會標記為不再變動，封存檔已包含該月的所有期數
+        cached = self.cache.get(year, month) if self.cache else None
+        return bool(cached and cached['immutable'])
+
     def crawlYear(self, year):
-        for m in range(1, 13):
-            self.crawlMonth(year, m)
+        return self.crawlMonths([(year, m) for m in range(1, 13)])
+
+    def crawlMonths(self, months):
+        # 解析前先載入這些月份所屬年份的分片，才能正確判斷哪些期數是新的
+        self.loadYears({y for y, m in months})
+
+        # 以執行緒池同時抓取多個月份，抓取完成後再依月份順序解析，結果與依序抓取相同
+        if self.max_workers <= 1 or len(months) <= 1:
+            responses = [self.crawlApi(y, m) for y, m in months]
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                responses = list(executor.map(lambda month: self.crawlApi(*month), months))
+
+        for data in responses:
+            if data:
+                self.new_draws.extend(self.parse(data))
         return self
 
     def crawlMonth(self, year, month):
+        self.loadYears([year])
         data = self.crawlApi(year, month)
         if data:
-            self.parse(data)
+            self.new_draws.extend(self.parse(data))
         return self
 
+    def crawlApi(self, year, month, revalidate=False):
+        """取得某個月份的 API 回應，revalidate 時已結束的月份也以條件式請求向伺服器確認"""
+        print(f'爬取 {year}/{month} 的資料')
+
+        if year < 103 or year > datetime.now(TAIPEI).year - 1911 or month < 1 or month > 12:
+            return None
+
+        # 同一次執行中已取得的月份直接沿用，例如檢查最新一期後再爬取當月
+        if (year, month) in self._run_responses:
+            return self._run_responses[(year, month)]
+
+        cached = self.cache.get(year, month) if self.cache else None
+        if cached and cached['immutable'] and not revalidate:
+            # 已結束的月份開獎結果不會再變動，不需重新抓取
+            self._recordCacheHit()
+            content = cached['body'].encode('utf-8')
+            self._run_responses[(year, month)] = content
+            return content
+
+        # 尚未結束的月份以條件式請求確認是否有更新
+        headers = {}
+        if cached and cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached and cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+
+        requestApi = f'{self.api}?period&month={year + 1911}-{"0" if month < 10 else ""}{month}&pageNum=1&pageSize=50'
+        response = self._request(requestApi, headers)
+        if response is None:
+            return None
+
+        if response.status_code == 304:
+            self._recordCacheHit()
+            content = cached['body'].encode('utf-8')
+            if not cached['immutable'] and self._isClosedMonth(year, month) and self._hasDraws(content):
+                # 月份結束後確認內容未變，之後不需再重新確認
+                self.cache.put(year, month, content, True,
+                               response.headers.get('ETag') or cached.get('etag'),
+                               response.headers.get('Last-Modified') or cached.get('last_modified'))
+        else:
+            content = response.content
+            if self.cache:
+                # 沒有開獎資料的回應可能是暫時性的異常，不標記為不再變動
+                immutable = self._isClosedMonth(year, month) and self._hasDraws(content)
+                self.cache.put(year, month, content, immutable,
+                               response.headers.get('ETag'), response.headers.get('Last-Modified'))
+
+        self._run_responses[(year, month)] = content
+        return content
+
+    def _isClosedMonth(self, year, month):
+        # 以台灣時間判斷月份是否已結束，與開獎日程一致
+        now = datetime.now(TAIPEI)
+        return (year + 1911, month) < (now.year, now.month)
+
+    def _hasDraws(self, content):
+        try:
+            return bool(json.loads(content).get('content', {}).get(self.result_key))
+        except ValueError:
+            return False
+
+    def _request(self, requestApi, headers=None):
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                # 指數退避並加上隨機抖動，避免多個執行緒同時重試
+                delay = self.backoff * (2 ** (attempt - 1))
+                time.sleep(delay + random.uniform(0, delay))
+
+            start = time.perf_counter()
+            try:
+                response = self.session.get(requestApi, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._recordRequest(start, 0, attempt)
+                error = f'爬取資料時發生錯誤: {str(e)}'
+                continue
+            except Exception as e:
+                self._recordRequest(start, 0, attempt)
+                self._recordFailure()
+                print(f'爬取資料時發生錯誤: {str(e)}')
+                return None
+
+            self._recordRequest(start, len(response.content), attempt)
+            if response.status_code in (200, 304):
+                return response
+            elif response.status_code >= 500:
+                # 伺服器錯誤可能只是暫時性的，稍後重試
+                error = f'請求失敗: {response.status_code}'
+                continue
+            else:
+                self._recordFailure()
+                print(f'請求失敗: {response.status_code}')
+                return None
+
+        self._recordFailure()
+        print(f'{error}（已重試 {self.max_retries} 次）')
+        return None
+
+    def resetStats(self):
+        with self._stats_lock:
+            self.stats = {
+                'requests': 0,
+                'cache_hits': 0,
+                'retries': 0,
+                'failures': 0,
+                'bytes': 0,
+                'total_latency': 0.0,
+                'max_latency': 0.0
+            }
+
+    def _recordRequest(self, start, size, attempt):
+        latency = time.perf_counter() - start
+        with self._stats_lock:
+            self.stats['requests'] += 1
+            self.stats['retries'] += 1 if attempt > 0 else 0
+            self.stats['bytes'] += size
+            self.stats['total_latency'] += latency
+            self.stats['max_latency'] = max(self.stats['max_latency'], latency)
+
+    def _recordCacheHit(self):
+        with self._stats_lock:
+            self.stats['cache_hits'] += 1
+
+    def _recordFailure(self):
+        with self._stats_lock:
+            self.stats['failures'] += 1
+
+    def getStats(self):
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['avg_latency'] = stats['total_latency'] / stats['requests'] if stats['requests'] else 0.0
+        return stats
+
+    def printStats(self):
+        stats = self.getStats()
+        print(f'請求 {stats["requests"]} 次，快取命中 {stats["cache_hits"]} 次，重試 {stats["retries"]} 次，失敗 {stats["failures"]} 個月份，'
+              f'下載 {stats["bytes"] / 1024:.1f} KB，'
+              f'平均延遲 {stats["avg_latency"] * 1000:.0f} ms，最大延遲 {stats["max_latency"] * 1000:.0f} ms')
+
     def getAllDraws(self, r=False):
-        return sorted(self.draws.items(), key=lambda x: x[1]['draw'], reverse=r)
+        return self.draws.sorted_items(reverse=r)
 
     def getFirstDraw(self):
-        sortedDraws = self.getAllDraws()
-        return sortedDraws[0][1] if len(sortedDraws) > 0 else None
+        self.loadYears(self.archive.years()[:1])
+        return self.draws.first()
     
     def getLastDraw(self):
-        sortedDraws = self.getAllDraws(r=True)
-        return sortedDraws[0][1] if len(sortedDraws) > 0 else None
+        return self.draws.latest()
 
     def getDraw(self, id='103000001'):
+        self.loadYears([term_year(id)])
         return self.draws[id]
 
-    def load(self, filepath=''):
+    def load(self, filepath='', lazy=True):
+        # 預設只載入最新一年的分片，其他年份在爬取或查詢時才載入
         if filepath == '':
-            filename = f'{self.default_dir}/{self.default_filename}'
-
-        print(f'載入資料從 {filename}')
+            archive = self.archive
+            print(f'載入資料從 {archive.path}')
+            self.draws = DrawStore()
+            self.loaded_years = set()
+            years = archive.years()
+            return self.loadYears(years[-1:] if lazy else years)
+
+        print(f'載入資料從 {filepath}')
         try:
-            with open(filename, 'r', encoding='utf-8') as fp:
-                self.draws = json.load(fp)
+            with open(filepath, 'r', encoding='utf-8') as fp:
+                self.draws = DrawStore(json.load(fp).values())
         except:
-            print(f'開啟 {filename} 錯誤')
+            print(f'開啟 {filepath} 錯誤')
+        self.loaded_years = {term_year(term) for term in self.draws}
+
+        return self
+
+    def loadYears(self, years):
+        years = set(years) - self.loaded_years
+        if years:
+            archive = self.archive
+            self.draws.merge(archive.draws(years))
+            self.loaded_years |= years
 
         return self
             
     def save(self, filepath=''):
-        if filepath == '':
-            filename = f'{self.default_dir}/{self.default_filename}'
-            
-        print(f'儲存資料至 {filename}')
+        # 重寫已載入年份的分片，未載入的年份維持不變；只有新期數時改用 append
+        archive = self.archive
+        print(f'儲存資料至 {archive.path}')
+        archive.write(self.draws.values())
 
-        with open(filename, 'w', encoding='utf-8') as fp:
-            fp.write(json.dumps(self.draws, indent=2, ensure_ascii=False, check_circular=False))
+        if filepath != '':
+            self.export(filepath)
 
         return self
 
-class BigLotto(LottoBase):
-    def __init__(self):
-        super().__init__('https://api.taiwanlottery.com/TLCAPIWeB/Lottery/Lotto649Result')
-        self.default_filename = 'BigLotto.json'
+    def append(self, draws):
+        # 只把新的期數以固定長度的紀錄附加在封存檔結尾
+        if not draws:
+            return self
 
-    def crawlApi(self, year, month):
-        print(f'爬取 {year}/{month} 的資料')
+        archive = self.archive
+        added = archive.append(draws)
+        print(f'新增 {added} 期至 {archive.path}')
 
-        if year < 103 or year > datetime.now().year - 1911 or month < 1 or month > 12:
-            return None
+        return self
 
-        requestApi = f'{self.api}?period&month={year + 1911}-{"0" if month < 10 else ""}{month}&pageNum=1&pageSize=50'
+    def export(self, filepath=''):
+        # 匯出與舊版相同格式的 JSON 資料檔，需先載入所有年份
+        filename = filepath or f'{self.default_dir}/{self.default_filename}'
+        self.loadYears(self.archive.years())
 
-        try:
-            response = requests.get(requestApi)
-            if response.status_code == 200:
-                return response.content
-            else:
-                print(f'請求失敗: {response.status_code}')
-                return None
-        except Exception as e:
-            print(f'爬取資料時發生錯誤: {str(e)}')
-            return None
+        print(f'匯出資料至 {filename}')
+
+        with open(filename, 'w', encoding='utf-8') as fp:
+            fp.write(json.dumps(dict(self.draws), indent=2, ensure_ascii=False, check_circular=False))
+
+        return self
+
+class BigLotto(LottoBase):
+    def __init__(self, api='https://api.taiwanlottery.com/TLCAPIWeB/Lottery/Lotto649Result', **kwargs):
+        super().__init__(api, **kwargs)
+        self.default_filename = 'BigLotto.json'
+        self.result_key = 'lotto649Res'
 
     def parse(self, jsonString):
         data = json.loads(jsonString)
         content = data["content"]
         draws = content["lotto649Res"]
 
+        new_draws = []
         for draw in draws:
             drawID = draw["period"]
             date = datetime.strptime(draw["lotteryDate"], "%Y-%m-%dT%H:%M:%S")
@@ -146,7 +440,7 @@ class BigLotto(LottoBase):
             specialNum = draw["drawNumberAppear"][6]
             price = draw["totalAmount"]
 
-            self.draws[str(drawID)] = {
+            record = {
                 'draw': str(drawID),
                 'date': date,
                 'year': int(date.split('/')[0]),
@@ -158,35 +452,24 @@ class BigLotto(LottoBase):
                 'bonus_num': specialNum
             }
 
-class SuperLotto(LottoBase):
-    def __init__(self):
-        super().__init__('https://api.taiwanlottery.com/TLCAPIWeB/Lottery/SuperLotto638Result')
-        self.default_filename = 'SuperLotto.json'
+            if str(drawID) not in self.draws:
+                new_draws.append(record)
+            self.draws[str(drawID)] = record
 
-    def crawlApi(self, year, month):
-        print(f'爬取 {year}/{month} 的資料')
-
-        if year < 103 or year > datetime.now().year - 1911 or month < 1 or month > 12:
-            return None
+        return new_draws
 
-        requestApi = f'{self.api}?period&month={year + 1911}-{"0" if month < 10 else ""}{month}&pageNum=1&pageSize=50'
-
-        try:
-            response = requests.get(requestApi)
-            if response.status_code == 200:
-                return response.content
-            else:
-                print(f'請求失敗: {response.status_code}')
-                return None
-        except Exception as e:
-            print(f'爬取資料時發生錯誤: {str(e)}')
-            return None
+class SuperLotto(LottoBase):
+    def __init__(self, api='https://api.taiwanlottery.com/TLCAPIWeB/Lottery/SuperLotto638Result', **kwargs):
+        super().__init__(api, **kwargs)
+        self.default_filename = 'SuperLotto.json'
+        self.result_key = 'superLotto638Res'
 
     def parse(self, jsonString):
         data = json.loads(jsonString)
         content = data["content"]
         draws = content["superLotto638Res"]
 
+        new_draws = []
         for draw in draws:
             drawID = draw["period"]
             date = datetime.strptime(draw["lotteryDate"], "%Y-%m-%dT%H:%M:%S")
@@ -196,7 +479,7 @@ class SuperLotto(LottoBase):
             specialNum = draw["drawNumberAppear"][6]
             price = draw["totalAmount"]
 
-            self.draws[str(drawID)] = {
+            record = {
                 'draw': str(drawID),
                 'date': date,
                 'year': int(date.split('/')[0]),
@@ -208,35 +491,26 @@ class SuperLotto(LottoBase):
                 'bonus_num': specialNum
             }
 
-class DailyCash(LottoBase):
-    def __init__(self):
-        super().__init__('https://api.taiwanlottery.com/TLCAPIWeB/Lottery/Daily539Result')
-        self.default_filename = 'DailyCash.json'
+            if str(drawID) not in self.draws:
+                new_draws.append(record)
+            self.draws[str(drawID)] = record
 
-    def crawlApi(self, year, month):
-        print(f'爬取 {year}/{month} 的資料')
+        return new_draws
 
-        if year < 103 or year > datetime.now().year - 1911 or month < 1 or month > 12:
-            return None
-
-        requestApi = f'{self.api}?period&month={year + 1911}-{"0" if month < 10 else ""}{month}&pageNum=1&pageSize=50'
-
-        try:
-            response = requests.get(requestApi)
-            if response.status_code == 200:
-                return response.content
-            else:
-                print(f'請求失敗: {response.status_code}')
-                return None
-        except Exception as e:
-            print(f'爬取資料時發生錯誤: {str(e)}')
-            return None
+class DailyCash(LottoBase):
+    def __init__(self, api='https://api.taiwanlottery.com/TLCAPIWeB/Lottery/Daily539Result', **kwargs):
+        super().__init__(api, **kwargs)
+        self.default_filename = 'DailyCash.json'
+        self.result_key = 'daily539Res'
+        self.numbers = 5
+        self.has_bonus = False
 
     def parse(self, jsonString):
         data = json.loads(jsonString)
         content = data["content"]
         draws = content["daily539Res"]
 
+        new_draws = []
         for draw in draws:
             drawID = draw["period"]
             date = datetime.strptime(draw["lotteryDate"], "%Y-%m-%dT%H:%M:%S")
@@ -244,7 +518,7 @@ class DailyCash(LottoBase):
             draw_numbers = draw["drawNumberAppear"][:5]
             size_numbers = draw["drawNumberSize"][:5]
 
-            self.draws[str(drawID)] = {
+            record = {
                 'draw': str(drawID),
                 'date': date,
                 'year': int(date.split('/')[0]),
@@ -255,36 +529,113 @@ class DailyCash(LottoBase):
                 'size_order_nums': size_numbers
             }
 
-def update_all_lotto(force_update=False):
+            if str(drawID) not in self.draws:
+                new_draws.append(record)
+            self.draws[str(drawID)] = record
+
+        return new_draws
+
+# 各彩種的名稱、爬蟲類別與對應的資料表
+LOTTO_GAMES = [
+    ('大樂透', BigLotto, 'big_lotto'),
+    ('威力彩', SuperLotto, 'super_lotto'),
+    ('今彩539', DailyCash, 'daily_cash')
+]
+
+def archive_draws_after(archive, stored):
+    """封存檔中比數據庫最新一期 stored（latest_draw 的結果）還新的期數"""
+    if stored is None:
+        return archive.draws()
+    years = [year for year in archive.years() if year >= term_year(stored[0])]
+    return [draw for draw in archive.draws(years) if int(draw['draw']) > int(stored[0])]
+
+def update_lotto(name, lotto_class, table, force_update=False, repair=False, until=None):
+    """單一彩種的完整更新流程：載入 → 爬取 → 儲存 → 寫入數據庫，repair 時改為只補抓缺少的期數
+
+    until 為預期的開獎時間，增量更新會爬取到該時間所在的月份
+    """
+    result = {'name': name, 'latest': None, 'latest_date': None, 'added': 0, 'error': None, 'timings': {}}
+    start = time.perf_counter()
+    stage_start = start
+
+    def finish_stage(stage):
+        nonlocal stage_start
+        now = time.perf_counter()
+        result['timings'][stage] = now - stage_start
+        stage_start = now
+
+    print(f'=== 開始更新{name}資料 ===')
+    try:
+        from create_db import import_data, ingest_draws, latest_draw
+
+        lotto = lotto_class().load()
+        finish_stage('load')
+        if repair:
+            lotto.repair()
+        else:
+            lotto.crawl(force_update, until)
+        finish_stage('crawl')
+
+        if force_update:
+            # 強制更新時重寫整個封存檔並與數據庫完整同步
+            lotto.save()
+            finish_stage('save')
+            result['added'] = import_data([table])[table]
+        else:
+            # 新發現的期數先附加在封存檔結尾，再把封存檔中比數據庫新的期數寫入數據庫；
+            # 上次寫入數據庫失敗時封存檔已比數據庫新，這次一併補寫
+            lotto.append(lotto.new_draws)
+            finish_stage('save')
+            result['added'] = ingest_draws(table, archive_draws_after(lotto.archive, latest_draw(table)))
+        finish_stage('import')
+
+        # 以數據庫的最新一期為準，寫入數據庫失敗時不會誤判已取得新期數
+        lastDraw = latest_draw(table)
+        result['latest'] = lastDraw[0] if lastDraw else None
+        result['latest_date'] = lastDraw[1] if lastDraw else None
+        print(f'{name}最新一期: {result["latest"]}，新增 {result["added"]} 期')
+    except Exception as e:
+        result['error'] = str(e)
+        print(f'{name}更新失敗: {str(e)}')
+
+    result['elapsed'] = time.perf_counter() - start
+    return result
+
+def update_all_lotto(force_update=False, repair=False, games=None):
     # 確保data目錄存在
     os.makedirs('data', exist_ok=True)
-    
-    print('=== 開始更新大樂透資料 ===')
-    bigLotto = BigLotto().load().crawl(force_update).save()
-    print(f'大樂透最新一期: {bigLotto.getLastDraw()["draw"]}\n')
-    
-    print('=== 開始更新威力彩資料 ===')
-    superLotto = SuperLotto().load().crawl(force_update).save()
-    print(f'威力彩最新一期: {superLotto.getLastDraw()["draw"]}\n')
-    
-    print('=== 開始更新今彩539資料 ===')
-    dailyCash = DailyCash().load().crawl(force_update).save()
-    print(f'今彩539最新一期: {dailyCash.getLastDraw()["draw"]}\n')
-    
-    print('=== 所有資料更新完成 ===')
 
-    # 更新數據庫
-    print('=== 開始更新數據庫 ===')
-    try:
-        from create_db import import_data
-        import_data()
-        print('數據庫更新成功')
-    except Exception as e:
-        print(f'數據庫更新失敗: {str(e)}')
+    # games 可替換各彩種建立爬蟲的方式，例如指向本機的 API 替身
+    games = games or LOTTO_GAMES
+
+    # 各彩種獨立並行更新，其中一個失敗或較慢不影響其他彩種
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(games)) as executor:
+        futures = [
+            executor.submit(update_lotto, name, lotto_class, table, force_update, repair)
+            for name, lotto_class, table in games
+        ]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+
+    print('\n=== 更新結果 ===')
+    for result in results:
+        timings = '，'.join(f'{stage} {seconds:.2f}s' for stage, seconds in result['timings'].items())
+        if result['error']:
+            print(f'{result["name"]}: 失敗（{result["error"]}），耗時 {result["elapsed"]:.2f}s（{timings}）')
+        else:
+            print(f'{result["name"]}: 最新一期 {result["latest"]}，新增 {result["added"]} 期，'
+                  f'耗時 {result["elapsed"]:.2f}s（{timings}）')
+    print(f'總耗時 {elapsed:.2f}s，各彩種依序執行約需 {sum(result["elapsed"] for result in results):.2f}s')
+
+    return results
 
 if __name__ == "__main__":
     # 正常更新（只更新新資料）
     update_all_lotto()
     
     # 如果需要強制更新所有資料，使用：
-    # update_all_lotto(force_update=True) 
\ No newline at end of file
+    # update_all_lotto(force_update=True)
+    
+    # 只補抓缺少的期數，使用：
+    # update_all_lotto(repair=True) 
\ No newline at end of file
@@ -1,7 +1,10 @@
 from flask import Flask, render_template, request, jsonify
-import sqlite3
 from datetime import datetime
-from lottery_analysis import analyze_lottery, analyze_repeat_numbers, analyze_special_numbers, analyze_combination_numbers, analyze_prediction_numbers, analyze_route_numbers, analyze_repetition_numbers, analyze_consecutive_numbers, analyze_numeric_numbers, analyze_distribution_numbers
+from lottery_analysis import analyze_lottery, analyze_repeat_numbers, analyze_special_numbers, analyze_combination_numbers, analyze_prediction_numbers, analyze_route_numbers, analyze_repetition_numbers, analyze_consecutive_numbers, analyze_numeric_numbers, analyze_distribution_numbers, analyze_all
+from db import close_connections, enable_replica, read_connection
+from draw_snapshot import load_snapshot
+from draw_window import LOTTERY_TABLES, load_draw_history, load_draw_window
+from occurrence_table import load_occurrence_table
 from lottery_recommendation import (
     get_quick_picks,
     get_hot_combinations,
@@ -22,7 +25,9 @@ from lottery_recommendation import (
     get_festival_combinations
 )
 from prediction_models import LotteryPredictor
+from draw_scheduler import scheduler_enabled, start_scheduler
 import logging
+import os
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -31,95 +36,84 @@ app = Flask(__name__)
 
 predictor = LotteryPredictor()
 
+def preload_data():
+    """預先載入所有彩種的欄位快照、開獎歷史與累計出現次數表，之後的請求直接使用快取"""
+    for lottery_type in LOTTERY_TABLES:
+        load_snapshot(lottery_type)
+        load_draw_history(lottery_type)
+        load_occurrence_table(lottery_type)
+
+def create_app(replica=True, preload=False):
+    """準備網站應用並回傳
+
+    replica 為 True 時查詢改由記憶體中的資料庫副本提供，匯入更新資料庫後自動載入新的副本。
+    preload 為 True 時先載入所有開獎資料；gunicorn 以 preload_app 在主行程呼叫一次，
+    worker 於 fork 後以寫入時複製共用這些資料，不需各自載入。SQLite 連線不能跨行程使用，
+    因此載入後關閉主行程的連線，副本由各 worker 在第一次查詢時建立。
+    """
+    if replica:
+        enable_replica()
+    if preload:
+        preload_data()
+        close_connections()
+    return app
+
 def get_data_range():
-    conn = sqlite3.connect('lottery.db')
-    cursor = conn.cursor()
-    
-    ranges = {}
-    
-    # 獲取大樂透資料範圍
-    cursor.execute('''
-        SELECT MIN(draw_date), MAX(draw_date), 
-               MIN(draw_term), MAX(draw_term),
-               COUNT(draw_term)
-        FROM big_lotto
-    ''')
-    min_date, max_date, min_term, max_term, total_count = cursor.fetchone()
-    ranges['big_lotto'] = {
-        'start': min_date, 
-        'end': max_date,
-        'start_term': min_term,
-        'end_term': max_term,
-        'total': total_count
-    }
-    
-    # 獲取威力彩資料範圍
-    cursor.execute('''
-        SELECT MIN(draw_date), MAX(draw_date),
-               MIN(draw_term), MAX(draw_term),
-               COUNT(draw_term)
-        FROM super_lotto
-    ''')
-    min_date, max_date, min_term, max_term, total_count = cursor.fetchone()
-    ranges['super_lotto'] = {
-        'start': min_date, 
-        'end': max_date,
-        'start_term': min_term,
-        'end_term': max_term,
-        'total': total_count
-    }
-    
-    # 獲取今彩539資料範圍
-    cursor.execute('''
-        SELECT MIN(draw_date), MAX(draw_date),
-               MIN(draw_term), MAX(draw_term),
-               COUNT(draw_term)
-        FROM daily_cash
-    ''')
-    min_date, max_date, min_term, max_term, total_count = cursor.fetchone()
-    ranges['daily_cash'] = {
-        'start': min_date, 
-        'end': max_date,
-        'start_term': min_term,
-        'end_term': max_term,
-        'total': total_count
-    }
-    
-    conn.close()
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        
+        ranges = {}
+        
+        # 依換算後的開獎日數取得最早與最新一期，民國日期與期數字串在 99 年跨 100 年時排序會出錯
+        for table in ['big_lotto', 'super_lotto', 'daily_cash']:
+            cursor.execute(f'''
+                SELECT first.draw_date, last.draw_date,
+                       first.draw_term, last.draw_term,
+                       (SELECT COUNT(*) FROM {table})
+                FROM (SELECT draw_date, draw_term FROM {table} ORDER BY draw_day, id LIMIT 1) AS first,
+                     (SELECT draw_date, draw_term FROM {table} ORDER BY draw_day DESC, id DESC LIMIT 1) AS last
+            ''')
+            row = cursor.fetchone()
+            min_date, max_date, min_term, max_term, total_count = row if row else (None, None, None, None, 0)
+            ranges[table] = {
+                'start': min_date, 
+                'end': max_date,
+                'start_term': min_term,
+                'end_term': max_term,
+                'total': total_count
+            }
     return ranges
 
 def get_latest_draws():
-    conn = sqlite3.connect('lottery.db')
-    cursor = conn.cursor()
-    
-    # 獲取大樂透最新三期
-    cursor.execute('''
-        SELECT draw_term, draw_date, num1, num2, num3, num4, num5, num6, special_num 
-        FROM big_lotto 
-        ORDER BY draw_term DESC 
-        LIMIT 3
-    ''')
-    big_lotto = cursor.fetchall()
-    
-    # 獲取威力彩最新三期
-    cursor.execute('''
-        SELECT draw_term, draw_date, num1, num2, num3, num4, num5, num6, special_num 
-        FROM super_lotto 
-        ORDER BY draw_term DESC 
-        LIMIT 3
-    ''')
-    super_lotto = cursor.fetchall()
-    
-    # 獲取今彩539最新三期
-    cursor.execute('''
-        SELECT draw_term, draw_date, num1, num2, num3, num4, num5 
-        FROM daily_cash 
-        ORDER BY draw_term DESC 
-        LIMIT 3
-    ''')
-    daily_cash = cursor.fetchall()
-    
-    conn.close()
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        
+        # 獲取大樂透最新三期
+        cursor.execute('''
+            SELECT draw_term, draw_date, num1, num2, num3, num4, num5, num6, special_num 
+            FROM big_lotto 
+            ORDER BY draw_term DESC 
+            LIMIT 3
+        ''')
+        big_lotto = cursor.fetchall()
+        
+        # 獲取威力彩最新三期
+        cursor.execute('''
+            SELECT draw_term, draw_date, num1, num2, num3, num4, num5, num6, special_num 
+            FROM super_lotto 
+            ORDER BY draw_term DESC 
+            LIMIT 3
+        ''')
+        super_lotto = cursor.fetchall()
+        
+        # 獲取今彩539最新三期
+        cursor.execute('''
+            SELECT draw_term, draw_date, num1, num2, num3, num4, num5 
+            FROM daily_cash 
+            ORDER BY draw_term DESC 
+            LIMIT 3
+        ''')
+        daily_cash = cursor.fetchall()
 
     # 對每一期的號碼進行排序
     sorted_draws = {
@@ -156,30 +150,46 @@ def index():
     data_ranges = get_data_range()
     return render_template('index.html', draws=latest_draws, ranges=data_ranges)
 
-@app.route('/api/analyze/<lottery_type>')
-def analyze(lottery_type):
+def get_analysis_periods(lottery_type):
+    """讀取請求的回測期數，並依資料庫中實際的期數調整"""
+    periods = request.args.get('periods', default=50, type=int)
+    
+    if lottery_type not in LOTTERY_TABLES:
+        raise ValueError('不支援的彩券類型')
+    
+    # 如果請求的期數超過實際期數，則使用實際最大期數
+    periods = len(load_draw_window(lottery_type, periods))
+    
+    if periods < 10:  # 設置最小回測期數為10期
+        raise ValueError('週期性分析需要至少10期的數據才能得到有意義的結果')
+    
+    return periods
+
+@app.route('/api/analyze/all/<lottery_type>')
+def analyze_all_sections(lottery_type):
     try:
-        periods = request.args.get('periods', default=50, type=int)
-        
-        # 檢查資料庫中實際的期數
-        conn = sqlite3.connect('lottery.db')
-        cursor = conn.cursor()
-        
-        table_map = {
-            'big-lotto': 'big_lotto',
-            'super-lotto': 'super_lotto',
-            'daily-cash': 'daily_cash'
-        }
+        periods = get_analysis_periods(lottery_type)
         
-        cursor.execute(f'SELECT COUNT(*) FROM {table_map[lottery_type]}')
-        max_periods = cursor.fetchone()[0]
-        conn.close()
+        # 可用 ?sections=frequency,repeat 只計算部分分析項目
+        sections = request.args.get('sections', '')
+        sections = [section.strip() for section in sections.split(',') if section.strip()] or None
         
-        # 如果請求的期數超過實際期數，則使用實際最大期數
-        periods = min(periods, max_periods)
-        
-        if periods < 10:  # 設置最小回測期數為10期
-            raise ValueError('週期性分析需要至少10期的數據才能得到有意義的結果')
+        results = analyze_all(lottery_type, periods, sections)
+        return jsonify({
+            'lottery_type': lottery_type,
+            'periods': periods,
+            'results': results
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error in analyze_all: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/analyze/<lottery_type>')
+def analyze(lottery_type):
+    try:
+        periods = get_analysis_periods(lottery_type)
         
         results = analyze_lottery(lottery_type, periods)
         return jsonify(results)
@@ -190,25 +200,7 @@ def analyze(lottery_type):
 @app.route('/api/analyze/repeat/<lottery_type>')
 def analyze_repeat(lottery_type):
     try:
-        periods = request.args.get('periods', default=50, type=int)
-        
-        # 檢查資料庫中實際的期數
-        conn = sqlite3.connect('lottery.db')
-        cursor = conn.cursor()
-        table_map = {
-            'big-lotto': 'big_lotto',
-            'super-lotto': 'super_lotto',
-            'daily-cash': 'daily_cash'
-        }
-        cursor.execute(f'SELECT COUNT(*) FROM {table_map[lottery_type]}')
-        max_periods = cursor.fetchone()[0]
-        conn.close()
-        
-        # 如果請求的期數超過實際期數，則使用實際最大期數
-        periods = min(periods, max_periods)
-        
-        if periods < 10:  # 設置最小回測期數為10期
-            raise ValueError('週期性分析需要至少10期的數據才能得到有意義的結果')
+        periods = get_analysis_periods(lottery_type)
         
         results = analyze_repeat_numbers(lottery_type, periods)
         return jsonify(results)
@@ -219,25 +211,7 @@ def analyze_repeat(lottery_type):
 @app.route('/api/analyze/special/<lottery_type>')
 def analyze_special(lottery_type):
     try:
-        periods = request.args.get('periods', default=50, type=int)
-        
-        # 檢查資料庫中實際的期數
-        conn = sqlite3.connect('lottery.db')
-        cursor = conn.cursor()
-        table_map = {
-            'big-lotto': 'big_lotto',
-            'super-lotto': 'super_lotto',
-            'daily-cash': 'daily_cash'
-        }
-        cursor.execute(f'SELECT COUNT(*) FROM {table_map[lottery_type]}')
-        max_periods = cursor.fetchone()[0]
-        conn.close()
-        
-        # 如果請求的期數超過實際期數，則使用實際最大期數
-        periods = min(periods, max_periods)
-        
-        if periods < 10:  # 設置最小回測期數為10期
-            raise ValueError('週期性分析需要至少10期的數據才能得到有意義的結果')
+        periods = get_analysis_periods(lottery_type)
         
         results = analyze_special_numbers(lottery_type, periods)
         return jsonify(results)
@@ -248,25 +222,7 @@ def analyze_special(lottery_type):
 @app.route('/api/analyze/combination/<lottery_type>')
 def analyze_combination(lottery_type):
     try:
-        periods = request.args.get('periods', default=50, type=int)
-        
-        # 檢查資料庫中實際的期數
-        conn = sqlite3.connect('lottery.db')
-        cursor = conn.cursor()
-        table_map = {
-            'big-lotto': 'big_lotto',
-            'super-lotto': 'super_lotto',
-            'daily-cash': 'daily_cash'
-        }
-        cursor.execute(f'SELECT COUNT(*) FROM {table_map[lottery_type]}')
-        max_periods = cursor.fetchone()[0]
-        conn.close()
-        
-        # 如果請求的期數超過實際期數，則使用實際最大期數
-        periods = min(periods, max_periods)
-        
-        if periods < 10:  # 設置最小回測期數為10期
-            raise ValueError('週期性分析需要至少10期的數據才能得到有意義的結果')
+        periods = get_analysis_periods(lottery_type)
         
         results = analyze_combination_numbers(lottery_type, periods)
         return jsonify(results)
@@ -277,25 +233,7 @@ def analyze_combination(lottery_type):
 @app.route('/api/analyze/prediction/<lottery_type>')
 def analyze_prediction(lottery_type):
     try:
-        periods = request.args.get('periods', default=50, type=int)
-        
-        # 檢查資料庫中實際的期數
-        conn = sqlite3.connect('lottery.db')
-        cursor = conn.cursor()
-        table_map = {
-            'big-lotto': 'big_lotto',
-            'super-lotto': 'super_lotto',
-            'daily-cash': 'daily_cash'
-        }
-        cursor.execute(f'SELECT COUNT(*) FROM {table_map[lottery_type]}')
-        max_periods = cursor.fetchone()[0]
-        conn.close()
-        
-        # 如果請求的期數超過實際期數，則使用實際最大期數
-        periods = min(periods, max_periods)
-        
-        if periods < 10:  # 設置最小回測期數為10期
-            raise ValueError('週期性分析需要至少10期的數據才能得到有意義的結果')
+        periods = get_analysis_periods(lottery_type)
         
         results = analyze_prediction_numbers(lottery_type, periods)
         return jsonify(results)
@@ -306,25 +244,7 @@ def analyze_prediction(lottery_type):
 @app.route('/api/analyze/route/<lottery_type>')
 def analyze_route(lottery_type):
     try:
-        periods = request.args.get('periods', default=50, type=int)
-        
-        # 檢查資料庫中實際的期數
-        conn = sqlite3.connect('lottery.db')
-        cursor = conn.cursor()
-        table_map = {
-            'big-lotto': 'big_lotto',
-            'super-lotto': 'super_lotto',
-            'daily-cash': 'daily_cash'
-        }
-        cursor.execute(f'SELECT COUNT(*) FROM {table_map[lottery_type]}')
-        max_periods = cursor.fetchone()[0]
-        conn.close()
-        
-        # 如果請求的期數超過實際期數，則使用實際最大期數
-        periods = min(periods, max_periods)
-        
-        if periods < 10:  # 設置最小回測期數為10期
-            raise ValueError('週期性分析需要至少10期的數據才能得到有意義的結果')
+        periods = get_analysis_periods(lottery_type)
         
         results = analyze_route_numbers(lottery_type, periods)
         return jsonify(results)
@@ -335,25 +255,7 @@ def analyze_route(lottery_type):
 @app.route('/api/analyze/repetition/<lottery_type>')
 def analyze_repetition(lottery_type):
     try:
-        periods = request.args.get('periods', default=50, type=int)
-        
-        # 檢查資料庫中實際的期數
-        conn = sqlite3.connect('lottery.db')
-        cursor = conn.cursor()
-        table_map = {
-            'big-lotto': 'big_lotto',
-            'super-lotto': 'super_lotto',
-            'daily-cash': 'daily_cash'
-        }
-        cursor.execute(f'SELECT COUNT(*) FROM {table_map[lottery_type]}')
-        max_periods = cursor.fetchone()[0]
-        conn.close()
-        
-        # 如果請求的期數超過實際期數，則使用實際最大期數
-        periods = min(periods, max_periods)
-        
-        if periods < 10:  # 設置最小回測期數為10期
-            raise ValueError('週期性分析需要至少10期的數據才能得到有意義的結果')
+        periods = get_analysis_periods(lottery_type)
         
         results = analyze_repetition_numbers(lottery_type, periods)
         return jsonify(results)
@@ -364,25 +266,7 @@ def analyze_repetition(lottery_type):
 @app.route('/api/analyze/consecutive/<lottery_type>')
 def analyze_consecutive(lottery_type):
     try:
-        periods = request.args.get('periods', default=50, type=int)
-        
-        # 檢查資料庫中實際的期數
-        conn = sqlite3.connect('lottery.db')
-        cursor = conn.cursor()
-        table_map = {
-            'big-lotto': 'big_lotto',
-            'super-lotto': 'super_lotto',
-            'daily-cash': 'daily_cash'
-        }
-        cursor.execute(f'SELECT COUNT(*) FROM {table_map[lottery_type]}')
-        max_periods = cursor.fetchone()[0]
-        conn.close()
-        
-        # 如果請求的期數超過實際期數，則使用實際最大期數
-        periods = min(periods, max_periods)
-        
-        if periods < 10:  # 設置最小回測期數為10期
-            raise ValueError('週期性分析需要至少10期的數據才能得到有意義的結果')
+        periods = get_analysis_periods(lottery_type)
         
         results = analyze_consecutive_numbers(lottery_type, periods)
         return jsonify(results)
@@ -393,25 +277,7 @@ def analyze_consecutive(lottery_type):
 @app.route('/api/analyze/numeric/<lottery_type>')
 def analyze_numeric(lottery_type):
     try:
-        periods = request.args.get('periods', default=50, type=int)
-        
-        # 檢查資料庫中實際的期數
-        conn = sqlite3.connect('lottery.db')
-        cursor = conn.cursor()
-        table_map = {
-            'big-lotto': 'big_lotto',
-            'super-lotto': 'super_lotto',
-            'daily-cash': 'daily_cash'
-        }
-        cursor.execute(f'SELECT COUNT(*) FROM {table_map[lottery_type]}')
-        max_periods = cursor.fetchone()[0]
-        conn.close()
-        
-        # 如果請求的期數超過實際期數，則使用實際最大期數
-        periods = min(periods, max_periods)
-        
-        if periods < 10:  # 設置最小回測期數為10期
-            raise ValueError('週期性分析需要至少10期的數據才能得到有意義的結果')
+        periods = get_analysis_periods(lottery_type)
         
         results = analyze_numeric_numbers(lottery_type, periods)
         return jsonify(results)
@@ -422,25 +288,7 @@ def analyze_numeric(lottery_type):
 @app.route('/api/analyze/distribution/<lottery_type>')
 def analyze_distribution(lottery_type):
     try:
-        periods = request.args.get('periods', default=50, type=int)
-        
-        # 檢查資料庫中實際的期數
-        conn = sqlite3.connect('lottery.db')
-        cursor = conn.cursor()
-        table_map = {
-            'big-lotto': 'big_lotto',
-            'super-lotto': 'super_lotto',
-            'daily-cash': 'daily_cash'
-        }
-        cursor.execute(f'SELECT COUNT(*) FROM {table_map[lottery_type]}')
-        max_periods = cursor.fetchone()[0]
-        conn.close()
-        
-        # 如果請求的期數超過實際期數，則使用實際最大期數
-        periods = min(periods, max_periods)
-        
-        if periods < 10:  # 設置最小回測期數為10期
-            raise ValueError('週期性分析需要至少10期的數據才能得到有意義的結果')
+        periods = get_analysis_periods(lottery_type)
         
         results = analyze_distribution_numbers(lottery_type, periods)
         return jsonify(results)
@@ -541,23 +389,24 @@ def train_prediction_model(lottery_type):
             }), 400
             
         # 檢查資料庫中實際的期數
-        conn = sqlite3.connect('lottery.db')
-        cursor = conn.cursor()
         table_name = {
             'big-lotto': 'big_lotto',
             'super-lotto': 'super_lotto',
             'daily-cash': 'daily_cash'
         }[lottery_type]
         
-        cursor.execute(f'SELECT COUNT(*) FROM {table_name}')
-        available_periods = cursor.fetchone()[0]
-        conn.close()
+        with read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'SELECT COUNT(*) FROM {table_name}')
+            available_periods = cursor.fetchone()[0]
         
         # 如果請求的期數超過可用期數，使用可用期數
         periods = min(periods, available_periods)
         
         logger.info(f'開始訓練模型: {lottery_type}, 期數: {periods}')
         results = predictor.train_models(lottery_type, periods)
+        # 寫入模型檔，預測請求由其他 worker 處理時也能使用這次訓練的模型
+        predictor.save()
         logger.info(f'模型訓練完成: {results}')
         
         return jsonify({
@@ -578,8 +427,8 @@ def predict_next_draw(lottery_type):
         if lottery_type not in ['big-lotto', 'super-lotto', 'daily-cash']:
             return jsonify({'error': '不支援的彩券類型'}), 400
             
-        # 檢查模型是否已訓練
-        if predictor.rf_model is None:
+        # 檢查模型是否已訓練，其他 worker 訓練過時改用模型檔中的模型
+        if not predictor.refresh():
             return jsonify({'error': '請先訓練模型'}), 400
             
         logger.info(f'開始預測: {lottery_type}')
@@ -599,4 +448,8 @@ def predict_next_draw(lottery_type):
         return jsonify({'error': f'預測時發生錯誤: {str(e)}'}), 500
 
 if __name__ == '__main__':
-    app.run(debug=True) 
\ No newline at end of file
+    # 設定 LOTTO_SCHEDULER=1 時依開獎日程在背景自動更新資料
+    # 除錯模式會以子行程重新載入程式，只在實際提供服務的子行程中啟動
+    if scheduler_enabled() and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_scheduler()
+    create_app().run(debug=True) 
\ No newline at end of file
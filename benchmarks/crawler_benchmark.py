@@ -0,0 +1,144 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+from functools import partial
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_lottery_api import FakeLotteryAPI
+from db import open_writer
+from draw_archive import open_archive
+import Lotto_Crawler
+
+# 彩種名稱、爬蟲類別、資料表、API 路徑與封存目錄
+BENCH_GAMES = [
+    ('大樂透', Lotto_Crawler.BigLotto, 'big_lotto', 'Lotto649Result', 'BigLotto'),
+    ('威力彩', Lotto_Crawler.SuperLotto, 'super_lotto', 'SuperLotto638Result', 'SuperLotto'),
+    ('今彩539', Lotto_Crawler.DailyCash, 'daily_cash', 'Daily539Result', 'DailyCash')
+]
+
+@contextlib.contextmanager
+def workspace(with_data=True):
+    """在暫存目錄中執行，不影響專案的資料檔與數據庫"""
+    cwd = os.getcwd()
+    directory = tempfile.mkdtemp(prefix='lotto-bench-')
+    try:
+        if with_data:
+            for archive_name in [game[4] for game in BENCH_GAMES]:
+                shutil.copytree(os.path.join(ROOT, 'data', archive_name), os.path.join(directory, 'data', archive_name))
+            shutil.copy(os.path.join(ROOT, 'lottery.db'), directory)
+        os.chdir(directory)
+        yield directory
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(directory, ignore_errors=True)
+
+@contextlib.contextmanager
+def quiet(enabled=True):
+    if not enabled:
+        yield
+        return
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+def bench_full_crawl(api, workers, backoff, verbose=False):
+    """從頭完整爬取每個彩種，量測吞吐量並比對結果是否與封存資料相同"""
+    results = []
+    for name, lotto_class, table, path, archive_name in BENCH_GAMES:
+        with workspace(with_data=False):
+            lotto = lotto_class(api=api.url(path), max_workers=workers, backoff=backoff, use_cache=False)
+            api.reset_counts()
+            start = time.perf_counter()
+            with quiet(not verbose):
+                lotto.crawl(force_update=True)
+            elapsed = time.perf_counter() - start
+
+        expected = {draw['draw']: draw for draw in open_archive(os.path.join(ROOT, 'data', archive_name)).draws()}
+        stats = lotto.getStats()
+        results.append({
+            'name': name,
+            'workers': workers,
+            'elapsed': elapsed,
+            'requests': stats['requests'],
+            'retries': stats['retries'],
+            'failures': stats['failures'],
+            'draws': len(lotto.draws),
+            'correct': dict(lotto.draws) == expected
+        })
+    return results
+
+def bench_update(api, backoff, new_draws=3, verbose=False):
+    """移除每個彩種最新的幾期後執行 update_all_lotto，量測從爬取到寫入數據庫的時間"""
+    with workspace():
+        conn = open_writer('lottery.db')
+        for name, lotto_class, table, path, archive_name in BENCH_GAMES:
+            archive = open_archive(os.path.join('data', archive_name))
+            draws = archive.draws()
+            archive.create(draws[:-new_draws])
+            conn.executemany(f'DELETE FROM {table} WHERE draw_term = ?', [(draw['draw'],) for draw in draws[-new_draws:]])
+        conn.commit()
+        conn.close()
+
+        games = [
+            (name, partial(lotto_class, api=api.url(path), backoff=backoff, use_cache=False), table)
+            for name, lotto_class, table, path, archive_name in BENCH_GAMES
+        ]
+        api.reset_counts()
+        start = time.perf_counter()
+        with quiet(not verbose):
+            results = Lotto_Crawler.update_all_lotto(games=games)
+        elapsed = time.perf_counter() - start
+
+    return {
+        'elapsed': elapsed,
+        'requests': api.counts['requests'],
+        'added': sum(result['added'] for result in results),
+        'expected': new_draws * len(BENCH_GAMES),
+        'errors': [result['error'] for result in results if result['error']]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='以本機 API 替身量測爬蟲效能')
+    parser.add_argument('--latency', type=float, default=0.05, help='每個請求的延遲秒數')
+    parser.add_argument('--jitter', type=float, default=0.02, help='額外隨機延遲的上限秒數')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='回應 503 的比例')
+    parser.add_argument('--workers', default='1,4,8,16', help='要比較的同時抓取數，以逗號分隔')
+    parser.add_argument('--backoff', type=float, default=0.05, help='爬蟲重試的基本等待秒數')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-seconds', type=float, default=None,
+                        help='完整爬取任一彩種超過此秒數時以失敗結束，供 CI 偵測效能退化')
+    parser.add_argument('--verbose', action='store_true', help='顯示爬蟲的輸出')
+    args = parser.parse_args()
+
+    failed = False
+    with FakeLotteryAPI(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, seed=args.seed) as api:
+        print(f'延遲 {args.latency * 1000:.0f}ms（+0~{args.jitter * 1000:.0f}ms），錯誤率 {args.error_rate:.0%}')
+        print(f'{"彩種":<8}{"同時抓取":>8}{"耗時":>10}{"月份/秒":>10}{"請求":>8}{"重試":>8}{"失敗":>8}{"期數":>8}  結果')
+        for workers in [int(value) for value in args.workers.split(',')]:
+            for result in bench_full_crawl(api, workers, args.backoff, args.verbose):
+                months = result['requests'] - result['retries']
+                status = '正確' if result['correct'] else '不一致'
+                print(f'{result["name"]:<8}{result["workers"]:>8}{result["elapsed"]:>9.2f}s'
+                      f'{months / result["elapsed"]:>10.1f}{result["requests"]:>8}{result["retries"]:>8}'
+                      f'{result["failures"]:>8}{result["draws"]:>8}  {status}')
+                # 有注入錯誤時，重試用盡的月份會造成資料不一致，屬於預期結果
+                if not result['correct'] and args.error_rate == 0:
+                    failed = True
+                if args.max_seconds is not None and result['elapsed'] > args.max_seconds:
+                    failed = True
+
+        update = bench_update(api, args.backoff, verbose=args.verbose)
+        print(f'\n增量更新（三個彩種各 3 期新資料）: 耗時 {update["elapsed"]:.2f}s，'
+              f'請求 {update["requests"]} 次，新增 {update["added"]}/{update["expected"]} 期')
+        if update['errors'] or (args.error_rate == 0 and update['added'] != update['expected']):
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from draw_archive import open_archive
+
+# API 路徑對應的彩種資料與回應欄位
+GAMES = {
+    'Lotto649Result': ('BigLotto', 'lotto649Res'),
+    'SuperLotto638Result': ('SuperLotto', 'superLotto638Res'),
+    'Daily539Result': ('DailyCash', 'daily539Res')
+}
+
+def draw_to_payload(draw):
+    """將封存的開獎資料轉為台灣彩券 API 回應中的一期"""
+    numbers = draw['draw_order_nums'] + ([draw['bonus_num']] if 'bonus_num' in draw else [])
+    size_numbers = draw['size_order_nums'] + ([draw['bonus_num']] if 'bonus_num' in draw else [])
+    return {
+        'period': int(draw['draw']),
+        'lotteryDate': f"{draw['year'] + 1911}-{draw['month']:02d}-{draw['day']:02d}T00:00:00",
+        'drawNumberAppear': numbers,
+        'drawNumberSize': size_numbers,
+        'totalAmount': draw['price']
+    }
+
+def load_payloads(data_dir, source='archive'):
+    """載入各彩種每個月份的回應內容，source 為 archive（由封存資料產生）或 cache（重播爬蟲快取的原始回應）"""
+    payloads = {}
+    for path, (name, key) in GAMES.items():
+        months = {}
+        if source == 'cache':
+            cache_dir = os.path.join(data_dir, 'cache', name)
+            for filename in sorted(os.listdir(cache_dir)) if os.path.isdir(cache_dir) else []:
+                year, month = os.path.splitext(filename)[0].split('-')
+                with open(os.path.join(cache_dir, filename), 'r', encoding='utf-8') as fp:
+                    months[f'{int(year) + 1911}-{month}'] = json.load(fp)['body'].encode('utf-8')
+        else:
+            grouped = {}
+            for draw in open_archive(os.path.join(data_dir, name)).draws():
+                grouped.setdefault(f"{draw['year'] + 1911}-{draw['month']:02d}", []).append(draw_to_payload(draw))
+            for month, draws in grouped.items():
+                # 與正式 API 相同，同一個月份由新到舊排列
+                draws.sort(key=lambda draw: -draw['period'])
+                months[month] = json.dumps({'rtCode': 0, 'content': {key: draws}}).encode('utf-8')
+        payloads[path] = (key, months)
+    return payloads
+
+class FakeLotteryAPI:
+    """本機的台灣彩券 API 替身，可設定延遲與錯誤率，供爬蟲測試與效能量測使用"""
+
+    def __init__(self, data_dir=os.path.join(ROOT, 'data'), source='archive', latency=0.05, jitter=0.0,
+                 error_rate=0.0, seed=None, port=0):
+        self.payloads = load_payloads(data_dir, source)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.port = port
+        self.server = None
+        self._lock = threading.Lock()
+        self.reset_counts()
+
+    def reset_counts(self):
+        with self._lock:
+            self.counts = {'requests': 0, 'errors': 0, 'not_modified': 0}
+
+    def _count(self, key):
+        with self._lock:
+            self.counts[key] += 1
+
+    def _should_fail(self):
+        with self._lock:
+            return self.random.random() < self.error_rate
+
+    def _delay(self):
+        with self._lock:
+            return self.latency + self.random.uniform(0, self.jitter)
+
+    def respond(self, path, query, headers):
+        """回傳 (狀態碼, 標頭, 內容)"""
+        self._count('requests')
+        time.sleep(self._delay())
+        if self._should_fail():
+            # 模擬正式 API 偶發的伺服器錯誤
+            self._count('errors')
+            return 503, {}, b''
+
+        name = urlparse(path).path.rsplit('/', 1)[-1]
+        if name not in self.payloads:
+            return 404, {}, b''
+        key, months = self.payloads[name]
+        month = parse_qs(query).get('month', [''])[0]
+        body = months.get(month) or json.dumps({'rtCode': 0, 'content': {key: []}}).encode('utf-8')
+
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if headers.get('If-None-Match') == etag:
+            self._count('not_modified')
+            return 304, {'ETag': etag}, b''
+        return 200, {'ETag': etag, 'Content-Type': 'application/json'}, body
+
+    def start(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                status, headers, body = api.respond(url.path, url.query, self.headers)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', self.port), Handler)
+        self.port = self.server.server_port
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def url(self, name):
+        """彩種 API 的網址，name 為 Lotto649Result 等路徑名稱"""
+        return f'http://127.0.0.1:{self.port}/TLCAPIWeB/Lottery/{name}'
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='本機的台灣彩券 API 替身')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--data-dir', default=os.path.join(ROOT, 'data'))
+    parser.add_argument('--source', choices=['archive', 'cache'], default='archive')
+    parser.add_argument('--latency', type=float, default=0.05, help='每個請求的延遲秒數')
+    parser.add_argument('--jitter', type=float, default=0.0, help='額外隨機延遲的上限秒數')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='回應 503 的比例')
+    args = parser.parse_args()
+
+    api = FakeLotteryAPI(args.data_dir, args.source, args.latency, args.jitter, args.error_rate, port=args.port).start()
+    print(f'API 替身執行中: {api.url("Lotto649Result")}（Ctrl+C 結束）')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        api.stop()
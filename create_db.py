@@ -1,123 +1,429 @@
-import sqlite3
-import json
-
-def create_tables(conn):
-    cursor = conn.cursor()
-    
-    # 建立大樂透資料表
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS big_lotto (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        draw_term TEXT NOT NULL,
-        draw_date TEXT NOT NULL,
-        num1 INTEGER NOT NULL,
-        num2 INTEGER NOT NULL,
-        num3 INTEGER NOT NULL,
-        num4 INTEGER NOT NULL,
-        num5 INTEGER NOT NULL,
-        num6 INTEGER NOT NULL,
-        special_num INTEGER NOT NULL,
-        total_sales INTEGER,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    ''')
-    
-    # 建立威力彩資料表
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS super_lotto (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        draw_term TEXT NOT NULL,
-        draw_date TEXT NOT NULL,
-        num1 INTEGER NOT NULL,
-        num2 INTEGER NOT NULL,
-        num3 INTEGER NOT NULL,
-        num4 INTEGER NOT NULL,
-        num5 INTEGER NOT NULL,
-        num6 INTEGER NOT NULL,
-        special_num INTEGER NOT NULL,
-        total_sales INTEGER,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    ''')
-    
-    # 修改今彩539資料表结构
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS daily_cash (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        draw_term TEXT NOT NULL,
-        draw_date TEXT NOT NULL,
-        num1 INTEGER NOT NULL,
-        num2 INTEGER NOT NULL,
-        num3 INTEGER NOT NULL,
-        num4 INTEGER NOT NULL,
-        num5 INTEGER NOT NULL,
-        total_sales INTEGER,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    ''')
-    
-    conn.commit()
-
-def import_data():
-    conn = sqlite3.connect('lottery.db')
-    create_tables(conn)
-    cursor = conn.cursor()
-    
-    # 清空現有表格
-    cursor.execute('DELETE FROM big_lotto')
-    cursor.execute('DELETE FROM super_lotto')
-    cursor.execute('DELETE FROM daily_cash')
-    
-    # 匯入大樂透資料
-    with open('data/BigLotto.json', 'r', encoding='utf-8') as f:
-        big_lotto_data = json.load(f)
-        # 遍歷字典中的每個值
-        for item in big_lotto_data.values():  # 修改這裡
-            nums = item['draw_order_nums']
-            cursor.execute('''
-            INSERT INTO big_lotto (draw_term, draw_date, num1, num2, num3, num4, num5, num6, special_num, total_sales)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                item['draw'],
-                item['date'],
-                nums[0], nums[1], nums[2], nums[3], nums[4], nums[5],
-                item['bonus_num'],
-                item.get('price', None)  # 修改這裡，因為欄位名稱是 'price' 而不是 'total_sales'
-            ))
-    
-    # 匯入威力彩資料
-    with open('data/SuperLotto.json', 'r', encoding='utf-8') as f:
-        super_lotto_data = json.load(f)
-        for item in super_lotto_data.values():  # 修改這裡
-            nums = item['draw_order_nums']
-            cursor.execute('''
-            INSERT INTO super_lotto (draw_term, draw_date, num1, num2, num3, num4, num5, num6, special_num, total_sales)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                item['draw'],
-                item['date'],
-                nums[0], nums[1], nums[2], nums[3], nums[4], nums[5],
-                item['bonus_num'],
-                item.get('price', None)  # 修改這裡
-            ))
-    
-    # 匯入今彩539資料
-    with open('data/DailyCash.json', 'r', encoding='utf-8') as f:
-        daily_cash_data = json.load(f)
-        for item in daily_cash_data.values():
-            nums = item['draw_order_nums'][:5]  # 只取前5个号码
-            cursor.execute('''
-            INSERT INTO daily_cash (draw_term, draw_date, num1, num2, num3, num4, num5, total_sales)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                item['draw'],
-                item['date'],
-                nums[0], nums[1], nums[2], nums[3], nums[4],
-                item.get('price', None)
-            ))
-    
-    conn.commit()
-    conn.close()
-
-if __name__ == '__main__':
+import sqlite3
+import hashlib
+import os
+import re
+from datetime import date
+import threading
+from contextlib import contextmanager, nullcontext
+try:
+    import fcntl
+except ImportError:
+    # Windows 沒有 fcntl，只能避免同一行程內同時匯入
+    fcntl = None
+from db import DB_PATH, close_connections, open_writer, read_connection
+from draw_archive import load_draws
+from draw_snapshot import build_snapshots, snapshot_current, snapshot_path
+
+# 各資料表每期的號碼個數（不含特別號）
+NUMBER_COUNTS = {'big_lotto': 6, 'super_lotto': 6, 'daily_cash': 5}
+
+# 由民國開獎日期換算後存放的欄位：西元 1970-01-01 起算的日數、西元年、月與星期（星期一為 0）
+DATE_COLUMNS = ['draw_day', 'draw_year', 'draw_month', 'draw_weekday']
+
+def create_tables(conn):
+    cursor = conn.cursor()
+    
+    # 建立大樂透資料表
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS big_lotto (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        draw_term TEXT NOT NULL,
+        draw_date TEXT NOT NULL,
+        num1 INTEGER NOT NULL,
+        num2 INTEGER NOT NULL,
+        num3 INTEGER NOT NULL,
+        num4 INTEGER NOT NULL,
+        num5 INTEGER NOT NULL,
+        num6 INTEGER NOT NULL,
+        special_num INTEGER NOT NULL,
+        total_sales INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    
+    # 建立威力彩資料表
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS super_lotto (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        draw_term TEXT NOT NULL,
+        draw_date TEXT NOT NULL,
+        num1 INTEGER NOT NULL,
+        num2 INTEGER NOT NULL,
+        num3 INTEGER NOT NULL,
+        num4 INTEGER NOT NULL,
+        num5 INTEGER NOT NULL,
+        num6 INTEGER NOT NULL,
+        special_num INTEGER NOT NULL,
+        total_sales INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    
+    # 修改今彩539資料表结构
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS daily_cash (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        draw_term TEXT NOT NULL,
+        draw_date TEXT NOT NULL,
+        num1 INTEGER NOT NULL,
+        num2 INTEGER NOT NULL,
+        num3 INTEGER NOT NULL,
+        num4 INTEGER NOT NULL,
+        num5 INTEGER NOT NULL,
+        total_sales INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    
+    # 舊資料庫的期數欄位沒有唯一限制，先移除重複期數再補上唯一索引
+    for table in ['big_lotto', 'super_lotto', 'daily_cash']:
+        cursor.execute(f"SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_{table}_draw_term'")
+        if cursor.fetchone() is None:
+            cursor.execute(f'''
+            DELETE FROM {table}
+            WHERE id NOT IN (SELECT MAX(id) FROM {table} GROUP BY draw_term)
+            ''')
+            cursor.execute(f'CREATE UNIQUE INDEX idx_{table}_draw_term ON {table} (draw_term)')
+    
+    # 開獎日期換算為整數欄位並建立索引，查詢與排序不需再解析民國日期字串
+    for table in ['big_lotto', 'super_lotto', 'daily_cash']:
+        cursor.execute(f'PRAGMA table_info({table})')
+        existing_columns = {row[1] for row in cursor.fetchall()}
+        for column in DATE_COLUMNS:
+            if column not in existing_columns:
+                cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} INTEGER')
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_draw_day ON {table} (draw_day)')
+        fill_date_columns(conn, table)
+    
+    # 各彩種每個月份開獎資料的摘要，用來判斷重新匯入時哪些月份需要同步
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS draw_digests (
+        game TEXT NOT NULL,
+        month TEXT NOT NULL,
+        digest TEXT NOT NULL,
+        PRIMARY KEY (game, month)
+    )
+    ''')
+    
+    # 每期的每個號碼一列（不含特別號），draw_seq 為整數期數，依開獎順序遞增
+    # 主鍵涵蓋「最近 N 期的號碼」，號碼索引涵蓋「包含某號碼的期數」，兩者都是索引範圍掃描
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS draw_numbers (
+        game TEXT NOT NULL,
+        draw_seq INTEGER NOT NULL,
+        number INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        PRIMARY KEY (game, draw_seq, position)
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_draw_numbers_number ON draw_numbers (game, number, draw_seq)')
+    
+    # 以觸發程序維護 draw_numbers，新增、同步或刪除期數的任何寫入路徑都會一併更新
+    for table, count in NUMBER_COUNTS.items():
+        values = ', '.join(f"('{table}', CAST(NEW.draw_term AS INTEGER), NEW.num{i}, {i})" for i in range(1, count + 1))
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_numbers_insert AFTER INSERT ON {table}
+        BEGIN
+            INSERT OR REPLACE INTO draw_numbers (game, draw_seq, number, position) VALUES {values};
+        END
+        ''')
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_numbers_delete AFTER DELETE ON {table}
+        BEGIN
+            DELETE FROM draw_numbers WHERE game = '{table}' AND draw_seq = CAST(OLD.draw_term AS INTEGER);
+        END
+        ''')
+        columns = ', '.join(f'num{i}' for i in range(1, count + 1))
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_numbers_update AFTER UPDATE OF draw_term, {columns} ON {table}
+        BEGIN
+            DELETE FROM draw_numbers WHERE game = '{table}' AND draw_seq = CAST(OLD.draw_term AS INTEGER);
+            INSERT OR REPLACE INTO draw_numbers (game, draw_seq, number, position) VALUES {values};
+        END
+        ''')
+        
+        # 舊的資料庫或筆數不一致時整個彩種重建
+        cursor.execute(f'SELECT COUNT(*) FROM {table}')
+        expected = cursor.fetchone()[0] * count
+        cursor.execute('SELECT COUNT(*) FROM draw_numbers WHERE game = ?', (table,))
+        if cursor.fetchone()[0] != expected:
+            cursor.execute('DELETE FROM draw_numbers WHERE game = ?', (table,))
+            for i in range(1, count + 1):
+                cursor.execute(f'''
+                INSERT INTO draw_numbers (game, draw_seq, number, position)
+                SELECT ?, CAST(draw_term AS INTEGER), num{i}, {i} FROM {table}
+                ''', (table,))
+    
+    conn.commit()
+
+# 各彩種的分片封存目錄與對應的資料表
+IMPORT_SOURCES = [
+    ('big_lotto', 'data/BigLotto'),
+    ('super_lotto', 'data/SuperLotto'),
+    ('daily_cash', 'data/DailyCash')
+]
+
+INSERT_SQL = {
+    'big_lotto': '''
+        INSERT OR IGNORE INTO big_lotto (draw_term, draw_date, num1, num2, num3, num4, num5, num6, special_num, total_sales)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''',
+    'super_lotto': '''
+        INSERT OR IGNORE INTO super_lotto (draw_term, draw_date, num1, num2, num3, num4, num5, num6, special_num, total_sales)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''',
+    'daily_cash': '''
+        INSERT OR IGNORE INTO daily_cash (draw_term, draw_date, num1, num2, num3, num4, num5, total_sales)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+}
+
+def parse_draw_date(draw_date):
+    """將 '114/02/28' 或 '114-02-28' 格式的民國日期轉為西元日期"""
+    year, month, day = (int(part) for part in re.split('[/-]', draw_date))
+    return date(year + 1911, month, day)
+
+def date_columns(draw_date):
+    """開獎日期對應的 DATE_COLUMNS 欄位值"""
+    day = parse_draw_date(draw_date)
+    return (day.toordinal() - date(1970, 1, 1).toordinal(), day.year, day.month, day.weekday())
+
+def fill_date_columns(conn, table):
+    """補上尚未換算日期欄位的資料列，新寫入的期數在匯入完成前一併換算"""
+    cursor = conn.cursor()
+    cursor.execute(f'SELECT id, draw_date FROM {table} WHERE draw_day IS NULL')
+    rows = [(*date_columns(draw_date), row_id) for row_id, draw_date in cursor.fetchall()]
+    if rows:
+        cursor.executemany(f'''
+            UPDATE {table} SET {', '.join(f'{column} = ?' for column in DATE_COLUMNS)}
+            WHERE id = ?
+        ''', rows)
+    return len(rows)
+
+# 與 draw_to_row 順序相同的資料表欄位
+ROW_COLUMNS = {
+    'big_lotto': 'draw_term, draw_date, num1, num2, num3, num4, num5, num6, special_num, total_sales',
+    'super_lotto': 'draw_term, draw_date, num1, num2, num3, num4, num5, num6, special_num, total_sales',
+    'daily_cash': 'draw_term, draw_date, num1, num2, num3, num4, num5, total_sales'
+}
+
+def draw_to_row(table, item):
+    """將爬蟲資料的一期開獎轉為資料表的一列"""
+    if table == 'daily_cash':
+        nums = item['draw_order_nums'][:5]  # 只取前5个号码
+        return (item['draw'], item['date'], *nums, item.get('price', None))
+    
+    nums = item['draw_order_nums'][:6]
+    return (item['draw'], item['date'], *nums, item['bonus_num'], item.get('price', None))
+
+def upsert_draws(conn, table, draws):
+    """只新增資料表中尚未存在的期數，回傳新增的筆數"""
+    cursor = conn.cursor()
+    cursor.execute(f'SELECT draw_term FROM {table}')
+    existing_terms = {row[0] for row in cursor.fetchall()}
+    
+    new_rows = [draw_to_row(table, item) for item in draws if item['draw'] not in existing_terms]
+    if new_rows:
+        cursor.executemany(INSERT_SQL[table], new_rows)
+    return len(new_rows)
+
+def month_digests(rows):
+    """依開獎月份（draw_date 的 YYY/MM）計算每月資料列的摘要，任何一期有變動都會改變該月的摘要"""
+    months = {}
+    for row in sorted(rows):
+        months.setdefault(row[1][:6], []).append(row)
+    return {month: hashlib.sha1(repr(month_rows).encode('utf-8')).hexdigest() for month, month_rows in months.items()}
+
+def root_digest(digests):
+    """由各月摘要計算整個彩種的摘要"""
+    content = ''.join(f'{month}:{digest};' for month, digest in sorted(digests.items()))
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+def table_digests(conn, table, months=None):
+    """以資料表目前的內容計算各月摘要，months 可指定只計算部分月份"""
+    cursor = conn.cursor()
+    if months is None:
+        cursor.execute(f'SELECT {ROW_COLUMNS[table]} FROM {table}')
+    else:
+        months = list(months)
+        cursor.execute(f'''
+            SELECT {ROW_COLUMNS[table]} FROM {table}
+            WHERE substr(draw_date, 1, 6) IN ({', '.join('?' for _ in months)})
+        ''', months)
+    return month_digests(cursor.fetchall())
+
+def schema_current(conn):
+    """資料庫是否已有目前版本的所有資料表與欄位，舊的資料庫需經過一次匯入完成升級"""
+    cursor = conn.cursor()
+    for table in ['big_lotto', 'super_lotto', 'daily_cash']:
+        cursor.execute(f'PRAGMA table_info({table})')
+        if not set(DATE_COLUMNS) <= {row[1] for row in cursor.fetchall()}:
+            return False
+    cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ('draw_digests', 'draw_numbers')")
+    return cursor.fetchone()[0] == 2
+
+def stored_digests(conn, table):
+    """資料庫記錄的各月摘要，尚未記錄時為空"""
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT month, digest FROM draw_digests WHERE game = ?', (table,))
+        return dict(cursor.fetchall())
+    except sqlite3.OperationalError:
+        return {}
+
+def update_digests(conn, table, months=None):
+    """依資料表目前的內容更新指定月份（預設為全部）的摘要"""
+    if months is None:
+        conn.execute('DELETE FROM draw_digests WHERE game = ?', (table,))
+        digests = table_digests(conn, table)
+    else:
+        months = set(months)
+        digests = table_digests(conn, table, months)
+        # 已經沒有資料的月份一併移除摘要
+        conn.executemany('DELETE FROM draw_digests WHERE game = ? AND month = ?',
+                         [(table, month) for month in months - digests.keys()])
+    conn.executemany('INSERT OR REPLACE INTO draw_digests (game, month, digest) VALUES (?, ?, ?)',
+                     [(table, month, digest) for month, digest in digests.items()])
+
+def sync_months(conn, table, rows, months):
+    """以封存檔的內容取代資料表中指定月份的資料，回傳 (新增的期數, 移除的期數)"""
+    cursor = conn.cursor()
+    before = set()
+    for month in months:
+        cursor.execute(f'SELECT draw_term FROM {table} WHERE substr(draw_date, 1, 6) = ?', (month,))
+        before.update(row[0] for row in cursor.fetchall())
+    
+    month_rows = [row for row in rows if row[1][:6] in months]
+    cursor.executemany(f'DELETE FROM {table} WHERE substr(draw_date, 1, 6) = ?', [(month,) for month in months])
+    cursor.executemany(INSERT_SQL[table], month_rows)
+    
+    after = {row[0] for row in month_rows}
+    return len(after - before), len(before - after)
+
+# 同一時間只允許一個匯入流程寫入資料庫
+_import_lock = threading.Lock()
+
+@contextmanager
+def import_lock(db_path=DB_PATH):
+    """取得匯入鎖，同一行程的其他執行緒與其他行程（例如獨立執行的開獎排程與手動更新）都需等待"""
+    with _import_lock:
+        with open(db_path + '.lock', 'a') as fp:
+            if fcntl:
+                fcntl.flock(fp, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(fp, fcntl.LOCK_UN)
+
+@contextmanager
+def staging_database(db_path=DB_PATH):
+    """在暫存資料庫中更新資料，完成後以原子替換換上新的資料庫檔案
+    
+    讀取端在替換前看到的是完整的舊資料，替換後開啟的連線則是完整的新資料，
+    不會讀到清空或匯入到一半的資料表。
+    """
+    staging_path = db_path + '.staging'
+    # 暫存資料庫的建立到替換都在鎖內完成，避免兩個行程互相覆寫暫存檔或以舊資料蓋掉對方的匯入
+    with import_lock(db_path):
+        if os.path.exists(staging_path):
+            os.remove(staging_path)
+        
+        # 以目前的資料庫作為起點，只需寫入新增的期數
+        staging = open_writer(staging_path)
+        if os.path.exists(db_path):
+            with read_connection(db_path) as live:
+                live.backup(staging)
+        
+        try:
+            create_tables(staging)
+            yield staging
+            for table in ['big_lotto', 'super_lotto', 'daily_cash']:
+                fill_date_columns(staging, table)
+            staging.commit()
+        except Exception:
+            staging.close()
+            os.remove(staging_path)
+            raise
+        staging.close()
+        
+        # 先建立新資料的欄位快照（含累計出現次數表），再替換資料庫，讀取端切換後即可直接使用
+        build_snapshots(staging_path, snapshot_path(db_path))
+        close_connections(staging_path)
+        os.replace(staging_path, db_path)
+
+def import_data(tables=None):
+    """比對封存檔與數據庫的各月摘要，只同步內容有變動的月份，tables 可指定只匯入部分資料表"""
+    changes = {}
+    with (read_connection(DB_PATH) if os.path.exists(DB_PATH) else nullcontext()) as live:
+        migrate = live is None or not schema_current(live)
+        for table, filename in IMPORT_SOURCES:
+            if tables is not None and table not in tables:
+                continue
+            rows = [draw_to_row(table, item) for item in load_draws(filename)]
+            if not rows:
+                print(f'{filename} 沒有開獎資料，略過 {table}')
+                continue
+            
+            digests = month_digests(rows)
+            stored = stored_digests(live, table) if live else {}
+            if root_digest(digests) != root_digest(stored):
+                changes[table] = (rows, digests)
+    
+    added = {table: 0 for table, filename in IMPORT_SOURCES if tables is None or table in tables}
+    removed = dict.fromkeys(added, 0)
+    if not changes and not migrate:
+        # 所有彩種的內容都與數據庫相同，不需要建立暫存資料庫
+        print('資料未變動，略過匯入')
+        if not snapshot_current(DB_PATH):
+            # 與替換資料庫的匯入互斥，並在取得鎖後重新確認，避免以舊版本的快照蓋掉對方剛建立的快照
+            with import_lock(DB_PATH):
+                if not snapshot_current(DB_PATH):
+                    build_snapshots(DB_PATH)
+        return added
+    
+    with staging_database() as conn:
+        for table, (rows, digests) in changes.items():
+            stored = stored_digests(conn, table)
+            if not stored:
+                # 尚未記錄摘要的資料庫，以目前的內容計算後再比對
+                stored = table_digests(conn, table)
+            months = {month for month in digests.keys() | stored.keys() if digests.get(month) != stored.get(month)}
+            added[table], removed[table] = sync_months(conn, table, rows, months)
+            update_digests(conn, table)
+            print(f'{table}: 同步 {len(months)} 個月份')
+    
+    print('新增期數: ' + ', '.join(f'{table} {count} 筆' for table, count in added.items()))
+    if any(removed.values()):
+        # 封存檔中已不存在的期數
+        print('移除期數: ' + ', '.join(f'{table} {count} 筆' for table, count in removed.items() if count))
+    return added
+
+def ingest_draws(table, draws):
+    """將爬蟲新發現的期數直接寫入數據庫，不需重新讀取整個封存檔"""
+    draws = list(draws)
+    if not draws:
+        # 沒有新資料時不替換數據庫，資料版本維持不變，快取繼續有效
+        return 0
+    
+    with staging_database() as conn:
+        added = upsert_draws(conn, table, draws)
+        # 只重新計算新期數所在月份的摘要，尚未記錄摘要時計算全部月份
+        months = {item['date'][:6] for item in draws}
+        update_digests(conn, table, months if stored_digests(conn, table) else None)
+    
+    print(f'新增期數: {table} {added} 筆')
+    return added
+
+def latest_draw(table, db_path=DB_PATH):
+    """數據庫中最新一期的 (期數, 開獎日期)，數據庫或資料表不存在、沒有資料時為 None"""
+    if not os.path.exists(db_path):
+        return None
+    with read_connection(db_path) as conn:
+        try:
+            return conn.execute(f'SELECT draw_term, draw_date FROM {table} ORDER BY draw_term DESC LIMIT 1').fetchone()
+        except sqlite3.OperationalError:
+            return None
+
+if __name__ == '__main__':
     import_data() 
\ No newline at end of file
@@ -0,0 +1,173 @@
+import os
+import sqlite3
+import itertools
+import threading
+from contextlib import contextmanager
+
+DB_PATH = 'lottery.db'
+
+# 唯讀連線以記憶體映射讀取資料庫（數據庫只有數 MB，可整個映射），並加大頁面快取
+MMAP_SIZE = 256 * 1024 * 1024
+CACHE_SIZE_KB = 16 * 1024
+# 每個連線保留的已編譯 SQL 數量，同一查詢重複執行時不需重新編譯
+CACHED_STATEMENTS = 256
+# 每個資料庫保留的閒置唯讀連線數
+POOL_SIZE = 8
+
+def dataset_version(path=DB_PATH):
+    """以資料庫檔案的狀態作為資料版本，檔案被改寫或替換時版本即改變"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+def _tune(conn):
+    conn.execute(f'PRAGMA mmap_size = {MMAP_SIZE}')
+    conn.execute(f'PRAGMA cache_size = -{CACHE_SIZE_KB}')
+    return conn
+
+def open_reader(path=DB_PATH):
+    """開啟唯讀連線，不會在資料庫不存在時建立空檔案"""
+    uri = 'file:' + os.path.abspath(path) + '?mode=ro'
+    conn = sqlite3.connect(uri, uri=True, cached_statements=CACHED_STATEMENTS, check_same_thread=False)
+    conn.execute('PRAGMA query_only = ON')
+    return _tune(conn)
+
+def open_writer(path):
+    """開啟寫入連線，匯入流程以 create_db 的匯入鎖確保同一時間只有一個寫入者"""
+    return _tune(sqlite3.connect(path, cached_statements=CACHED_STATEMENTS))
+
+class MemoryReplica:
+    """資料庫某個版本在記憶體中的完整副本，以 SQLite 備份 API 載入
+
+    副本是共享快取的記憶體數據庫，多個連線可同時讀取同一份資料。記憶體數據庫在最後一個
+    連線關閉時才釋放，因此保留一個連線維持副本存在，已取出的連線在副本關閉後仍可讀完。
+    """
+
+    _ids = itertools.count()
+
+    def __init__(self, path, version):
+        self.version = version
+        self.uri = f'file:lottery-replica-{next(MemoryReplica._ids)}?mode=memory&cache=shared'
+        self._anchor = sqlite3.connect(self.uri, uri=True, check_same_thread=False)
+        source = open_reader(path)
+        try:
+            source.backup(self._anchor)
+        finally:
+            source.close()
+
+    def connect(self):
+        conn = sqlite3.connect(self.uri, uri=True, cached_statements=CACHED_STATEMENTS, check_same_thread=False)
+        conn.execute('PRAGMA query_only = ON')
+        return conn
+
+    def close(self):
+        self._anchor.close()
+
+class ReaderPool:
+    """同一個資料庫檔案的唯讀連線池
+
+    連線在請求之間重複使用，省去每次開啟連線與讀取資料庫結構的成本。匯入以替換檔案的方式
+    更新資料庫，已開啟的連線仍指向舊檔案，因此每個連線記錄開啟時的資料版本，版本改變後
+    不再取用舊連線，改開新連線讀取新資料。
+
+    啟用記憶體副本後，連線改為讀取記憶體中的副本，查詢不再經過磁碟；資料版本改變時載入
+    新的副本並整個替換，之後取出的連線即讀取新資料。
+    """
+
+    def __init__(self, path=DB_PATH, size=POOL_SIZE):
+        self.path = path
+        self.size = size
+        self.use_replica = False
+        self.replica = None
+        self._idle = []
+        self._lock = threading.Lock()
+        self._replica_lock = threading.Lock()
+
+    def enable_replica(self):
+        """改由記憶體副本提供連線，資料庫存在時立即載入"""
+        self.use_replica = True
+        version = dataset_version(self.path)
+        if version is not None:
+            self._replica_for(version)
+
+    def _replica_for(self, version):
+        with self._replica_lock:
+            if self.replica is None or self.replica.version != version:
+                old, self.replica = self.replica, MemoryReplica(self.path, version)
+                if old is not None:
+                    old.close()
+            return self.replica
+
+    def _open(self, version):
+        if self.use_replica:
+            return self._replica_for(version).connect()
+        return open_reader(self.path)
+
+    @contextmanager
+    def connection(self):
+        version = dataset_version(self.path)
+        conn = None
+        with self._lock:
+            while self._idle:
+                idle_version, idle_conn = self._idle.pop()
+                if idle_version == version:
+                    conn = idle_conn
+                    break
+                idle_conn.close()
+        if conn is None:
+            conn = self._open(version)
+
+        try:
+            yield conn
+        finally:
+            # 讀取不會留下交易，保險起見仍結束可能未完成的讀取
+            if conn.in_transaction:
+                conn.rollback()
+            with self._lock:
+                if len(self._idle) < self.size and dataset_version(self.path) == version:
+                    self._idle.append((version, conn))
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    def close(self):
+        """關閉所有閒置連線與記憶體副本，之後使用時再重新開啟"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for version, conn in idle:
+            conn.close()
+        with self._replica_lock:
+            replica, self.replica = self.replica, None
+        if replica is not None:
+            replica.close()
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def _pool(path):
+    key = os.path.abspath(path)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ReaderPool(path)
+        return _pools[key]
+
+def read_connection(path=DB_PATH):
+    """從連線池取得唯讀連線，用法為 with read_connection() as conn，離開區塊時歸還連線"""
+    return _pool(path).connection()
+
+def enable_replica(path=DB_PATH):
+    """讓 path 的唯讀連線改由記憶體中的資料庫副本提供，供網站行程在啟動時呼叫"""
+    _pool(path).enable_replica()
+
+def close_connections(path=None):
+    """關閉連線池中的閒置連線，path 可指定只關閉某個資料庫的連線"""
+    with _pools_lock:
+        if path is None:
+            pools = list(_pools.values())
+        else:
+            pool = _pools.pop(os.path.abspath(path), None)
+            pools = [pool] if pool else []
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,448 @@
+import os
+import json
+import numpy as np
+
+# 封存檔開頭的識別字串與格式版本
+MAGIC = b'LOTTODRW'
+FORMAT_VERSION = 1
+
+# 檔頭固定 32 位元組，記錄格式版本、每筆長度與號碼設定
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('version', '<u2'),
+    ('record_size', '<u2'),
+    ('numbers', 'u1'),
+    ('has_bonus', 'u1'),
+    ('reserved', 'u1', (18,))
+])
+
+# 每期開獎固定 32 位元組，依期數由舊到新排列
+RECORD_DTYPE = np.dtype([
+    ('term', '<u4'),
+    ('year', '<u2'),
+    ('month', 'u1'),
+    ('day', 'u1'),
+    ('price', '<i8'),
+    ('draw_order', 'u1', (6,)),
+    ('size_order', 'u1', (6,)),
+    ('bonus', 'u1'),
+    ('reserved', 'u1', (3,))
+])
+
+HEADER_SIZE = HEADER_DTYPE.itemsize
+RECORD_SIZE = RECORD_DTYPE.itemsize
+
+def archive_path(json_path):
+    """JSON 資料檔對應的分片封存目錄"""
+    return os.path.splitext(json_path)[0]
+
+def term_year(term):
+    """期數前三碼為民國年，例如 114000031 屬於 114 年"""
+    return int(term) // 1000000
+
+def month_range(start, end):
+    """由 start 到 end（含）的所有 (年, 月)"""
+    year, month = start
+    months = []
+    while (year, month) <= tuple(end):
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+def draws_to_records(draws, numbers):
+    """將爬蟲格式的開獎資料轉為依期數排序的紀錄陣列"""
+    draws = sorted(draws, key=lambda draw: int(draw['draw']))
+    records = np.zeros(len(draws), dtype=RECORD_DTYPE)
+    if not draws:
+        return records
+
+    records['term'] = [int(draw['draw']) for draw in draws]
+    records['year'] = [draw['year'] for draw in draws]
+    records['month'] = [draw['month'] for draw in draws]
+    records['day'] = [draw['day'] for draw in draws]
+    # 沒有銷售金額的期數以 -1 表示
+    records['price'] = [draw['price'] if draw.get('price') is not None else -1 for draw in draws]
+    records['draw_order'][:, :numbers] = [draw['draw_order_nums'][:numbers] for draw in draws]
+    records['size_order'][:, :numbers] = [draw['size_order_nums'][:numbers] for draw in draws]
+    records['bonus'] = [draw.get('bonus_num', 0) for draw in draws]
+    return records
+
+def records_to_draws(records, numbers, has_bonus):
+    """將紀錄陣列還原為爬蟲格式的開獎資料，欄位與 JSON 資料檔相同"""
+    columns = zip(
+        records['term'].tolist(),
+        records['year'].tolist(),
+        records['month'].tolist(),
+        records['day'].tolist(),
+        records['price'].tolist(),
+        records['draw_order'][:, :numbers].tolist(),
+        records['size_order'][:, :numbers].tolist(),
+        records['bonus'].tolist()
+    )
+
+    draws = []
+    for term, year, month, day, price, draw_order, size_order, bonus in columns:
+        draw = {
+            'draw': str(term),
+            'date': f'{year}/{month:02d}/{day:02d}',
+            'year': year,
+            'month': month,
+            'day': day,
+            'price': price if price >= 0 else None,
+            'draw_order_nums': draw_order,
+            'size_order_nums': size_order
+        }
+        if has_bonus:
+            draw['bonus_num'] = bonus
+        draws.append(draw)
+    return draws
+
+class DrawArchive:
+    """只會附加的開獎封存檔：固定長度的紀錄依期數排列，可只讀取結尾或以 memmap 讀取全部"""
+
+    def __init__(self, path, numbers=None, has_bonus=None):
+        self.path = path
+        self.numbers = numbers
+        self.has_bonus = has_bonus
+        if self.exists():
+            # 既有的封存檔以檔頭記錄的設定為準
+            header = self._read_header()
+            self.numbers = int(header['numbers'])
+            self.has_bonus = bool(header['has_bonus'])
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def _read_header(self):
+        with open(self.path, 'rb') as fp:
+            header = np.frombuffer(fp.read(HEADER_SIZE), dtype=HEADER_DTYPE)
+        if len(header) != 1 or header[0]['magic'] != MAGIC:
+            raise ValueError(f'{self.path} 不是有效的封存檔')
+        header = header[0]
+        if header['version'] != FORMAT_VERSION or header['record_size'] != RECORD_SIZE:
+            raise ValueError(f'{self.path} 的格式版本不支援')
+        return header
+
+    def _header_bytes(self):
+        header = np.zeros(1, dtype=HEADER_DTYPE)
+        header['magic'] = MAGIC
+        header['version'] = FORMAT_VERSION
+        header['record_size'] = RECORD_SIZE
+        header['numbers'] = self.numbers
+        header['has_bonus'] = self.has_bonus
+        return header.tobytes()
+
+    def _infer_config(self, draws):
+        # 未指定號碼設定時，由第一期資料推得
+        if self.numbers is None or self.has_bonus is None:
+            if not draws:
+                raise ValueError('無法由空的開獎資料判斷號碼設定')
+            self.numbers = len(draws[0]['draw_order_nums'])
+            self.has_bonus = 'bonus_num' in draws[0]
+
+    def __len__(self):
+        if not self.exists():
+            return 0
+        # 中斷的附加可能留下不完整的紀錄，以完整的紀錄數為準
+        return max(0, os.path.getsize(self.path) - HEADER_SIZE) // RECORD_SIZE
+
+    def create(self, draws):
+        """以完整的開獎資料重寫封存檔"""
+        draws = list(draws)
+        self._infer_config(draws)
+        records = draws_to_records(draws, self.numbers)
+
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wb') as fp:
+            fp.write(self._header_bytes())
+            fp.write(records.tobytes())
+        os.replace(temp_path, self.path)
+        return self
+
+    def append(self, draws):
+        """將新的期數附加在結尾，回傳實際附加的筆數"""
+        draws = list(draws)
+        if not draws:
+            return 0
+        if not self.exists():
+            self.create(draws)
+            return len(draws)
+
+        count = len(self)
+        last_term = int(self.tail(1)['term'][0]) if count else 0
+        records = draws_to_records(draws, self.numbers)
+        older = records['term'][records['term'] <= last_term]
+        records = records[records['term'] > last_term]
+        if not np.isin(older, self.memmap()['term']).all():
+            # 有早於最後一期且尚未收錄的資料時無法單純附加，合併後重寫
+            existing = {draw['draw']: draw for draw in self.draws()}
+            added = sum(1 for draw in draws if draw['draw'] not in existing)
+            existing.update((draw['draw'], draw) for draw in draws)
+            self.create(existing.values())
+            return added
+
+        with open(self.path, 'rb+') as fp:
+            # 先截掉中斷附加留下的不完整紀錄
+            fp.truncate(HEADER_SIZE + count * RECORD_SIZE)
+            fp.seek(0, os.SEEK_END)
+            fp.write(records.tobytes())
+        return len(records)
+
+    def tail(self, count):
+        """只讀取最後 count 期的紀錄（由舊到新）"""
+        total = len(self)
+        count = min(max(0, count), total)
+        with open(self.path, 'rb') as fp:
+            fp.seek(HEADER_SIZE + (total - count) * RECORD_SIZE)
+            return np.frombuffer(fp.read(count * RECORD_SIZE), dtype=RECORD_DTYPE)
+
+    def read(self):
+        """讀取全部紀錄（由舊到新）"""
+        return self.tail(len(self))
+
+    def memmap(self):
+        """以 memmap 唯讀對應全部紀錄，不需一次載入記憶體"""
+        return np.memmap(self.path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE, shape=(len(self),))
+
+    def draws(self, records=None):
+        """將紀錄還原為爬蟲格式的開獎資料，預設為全部紀錄"""
+        return records_to_draws(self.read() if records is None else records, self.numbers, self.has_bonus)
+
+class ShardedArchive:
+    """依年份分片的開獎封存：每年一個封存檔，manifest.json 記錄各分片的期數範圍
+
+    增量爬取只需要讀取 manifest 與最新一年的分片，讀取量不會隨歷史資料增加。
+    """
+
+    def __init__(self, directory, numbers=None, has_bonus=None):
+        self.path = directory
+        self.numbers = numbers
+        self.has_bonus = has_bonus
+        self.manifest = self._read_manifest()
+        if self.manifest is not None:
+            self.numbers = self.manifest['numbers']
+            self.has_bonus = self.manifest['has_bonus']
+
+    def _manifest_path(self):
+        return os.path.join(self.path, 'manifest.json')
+
+    def _read_manifest(self):
+        try:
+            with open(self._manifest_path(), 'r', encoding='utf-8') as fp:
+                return json.load(fp)
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self):
+        path = self._manifest_path()
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as fp:
+            json.dump(self.manifest, fp, indent=2, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    def exists(self):
+        return self.manifest is not None
+
+    def years(self):
+        """已有資料的年份（由舊到新）"""
+        return sorted(int(year) for year in self.manifest['shards']) if self.manifest else []
+
+    def shard(self, year):
+        return DrawArchive(os.path.join(self.path, f'{year}.draws'), self.numbers, self.has_bonus)
+
+    def __len__(self):
+        return sum(shard['count'] for shard in self.manifest['shards'].values()) if self.manifest else 0
+
+    def last_term(self):
+        """最新一期的期數，沒有資料時為 None"""
+        years = self.years()
+        return self.manifest['shards'][str(years[-1])]['last'] if years else None
+
+    def _group(self, draws):
+        groups = {}
+        for draw in draws:
+            groups.setdefault(term_year(draw['draw']), []).append(draw)
+        return groups
+
+    def _update_manifest(self, years):
+        if self.manifest is None:
+            self.manifest = {'format': FORMAT_VERSION, 'numbers': self.numbers, 'has_bonus': self.has_bonus, 'shards': {}}
+        for year in years:
+            shard = self.shard(year)
+            # 已刪除的分片同樣自 manifest 移除
+            records = shard.read() if os.path.exists(shard.path) else ()
+            if len(records) == 0:
+                self.manifest['shards'].pop(str(year), None)
+                continue
+            self.manifest['shards'][str(year)] = {
+                'count': len(records),
+                'first': str(records['term'][0]),
+                'last': str(records['term'][-1])
+            }
+        self.manifest['shards'] = dict(sorted(self.manifest['shards'].items()))
+        self._write_manifest()
+
+    def write(self, draws):
+        """重寫開獎資料所屬年份的分片，其他年份的分片維持不變"""
+        draws = list(draws)
+        if self.numbers is None or self.has_bonus is None:
+            # 未指定號碼設定時，由第一期資料推得
+            if not draws:
+                raise ValueError('無法由空的開獎資料判斷號碼設定')
+            self.numbers = len(draws[0]['draw_order_nums'])
+            self.has_bonus = 'bonus_num' in draws[0]
+
+        os.makedirs(self.path, exist_ok=True)
+        groups = self._group(draws)
+        for year, year_draws in groups.items():
+            self.shard(year).create(year_draws)
+        self._update_manifest(groups)
+        return self
+
+    def create(self, draws):
+        """以完整的開獎資料重建所有分片"""
+        draws = list(draws)
+        self.write(draws)
+        stale = set(self.years()) - set(self._group(draws))
+        for year in stale:
+            os.remove(self.shard(year).path)
+        self._update_manifest(stale)
+        return self
+
+    def append(self, draws):
+        """將新的期數附加到所屬年份的分片，回傳實際附加的筆數"""
+        draws = list(draws)
+        if not draws:
+            return 0
+        if self.manifest is None:
+            self.write(draws)
+            return len(draws)
+
+        groups = self._group(draws)
+        added = sum(self.shard(year).append(year_draws) for year, year_draws in groups.items())
+        self._update_manifest(groups)
+        return added
+
+    def read(self, years=None):
+        """讀取指定年份（預設為全部）的紀錄（由舊到新）"""
+        years = self.years() if years is None else sorted(set(years) & set(self.years()))
+        if not years:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        return np.concatenate([self.shard(year).read() for year in years])
+
+    def tail(self, count):
+        """只讀取最後 count 期的紀錄，由最新的分片往前讀取所需的分片"""
+        parts = []
+        for year in reversed(self.years()):
+            if count <= 0:
+                break
+            records = self.shard(year).tail(count)
+            parts.append(records)
+            count -= len(records)
+        if not parts:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        return np.concatenate(parts[::-1])
+
+    def draws(self, years=None):
+        """將指定年份（預設為全部）的紀錄還原為爬蟲格式的開獎資料"""
+        return records_to_draws(self.read(years), self.numbers, self.has_bonus)
+
+    def gaps(self):
+        """找出缺少的期數及其可能的開獎月份，回傳 {(年, 月): [期數, ...]}
+
+        每年的期數由 001 起連續編號，manifest 的筆數與期數範圍一致的分片中間不會有缺漏，
+        只需讀取有缺漏的分片。缺少的期數落在前後兩期的開獎月份之間。
+        第一年與最後一年之間整年沒有分片的年份，每個月份都列入（期數清單為空）。
+        """
+        months = {}
+        years = self.years()
+        for year in years:
+            shard = self.manifest['shards'][str(year)]
+            first, last = int(shard['first']), int(shard['last'])
+            if shard['count'] != last - first + 1 or first != year * 1000000 + 1:
+                records = self.shard(year).read()
+                terms = records['term'].astype(np.int64)
+                expected = np.arange(year * 1000000 + 1, last + 1)
+                for term in np.setdiff1d(expected, terms).tolist():
+                    index = np.searchsorted(terms, term)
+                    # 前一期不存在時從當年一月開始找
+                    start = (year, 1) if index == 0 else (int(records['year'][index - 1]), int(records['month'][index - 1]))
+                    end = (int(records['year'][index]), int(records['month'][index]))
+                    for month in month_range(start, end):
+                        months.setdefault(month, []).append(str(term))
+
+        stored = set(years)
+        for year in range(years[0], years[-1]) if years else []:
+            if year not in stored:
+                for month in month_range((year, 1), (year, 12)):
+                    months.setdefault(month, [])
+        return months
+
+    def trailing_months(self):
+        """最新年份以前每一年最後一期所在的月份到十二月
+
+        年底缺少的期數無法由期數編號得知，這些月份需另外向伺服器確認是否還有未取得的期數。
+        """
+        months = []
+        for year in self.years()[:-1]:
+            last_month = int(self.shard(year).tail(1)['month'][0])
+            months.extend(month_range((year, last_month), (year, 12)))
+        return months
+
+def open_archive(path, numbers=None, has_bonus=None):
+    """開啟分片封存目錄，尚未建立時由同名的 JSON 資料檔轉換"""
+    archive = ShardedArchive(path, numbers, has_bonus)
+    if archive.exists():
+        return archive
+
+    if os.path.exists(path + '.json'):
+        return import_json(path + '.json', path, numbers, has_bonus)
+    return archive
+
+def import_json(json_path, path=None, numbers=None, has_bonus=None):
+    """將 JSON 資料檔合併進分片封存
+
+    同一期以 JSON 的內容為準，JSON 沒有的期數（例如匯出後爬到的新期數）維持不變，
+    以舊的 JSON 匯入不會刪除封存中較新的期數。
+    """
+    with open(json_path, 'r', encoding='utf-8') as fp:
+        draws = json.load(fp)
+    archive = ShardedArchive(path or archive_path(json_path), numbers, has_bonus)
+    if archive.exists():
+        merged = {draw['draw']: draw for draw in archive.draws()}
+        merged.update(draws)
+        draws = merged
+    return archive.create(draws.values())
+
+def export_json(path, json_path=None):
+    """將分片封存匯出為與舊版相同格式的 JSON 資料檔"""
+    archive = ShardedArchive(path)
+    draws = {draw['draw']: draw for draw in archive.draws()}
+    json_path = json_path or path + '.json'
+    with open(json_path, 'w', encoding='utf-8') as fp:
+        fp.write(json.dumps(draws, indent=2, ensure_ascii=False, check_circular=False))
+    return json_path
+
+def load_draws(path):
+    """讀取分片封存的全部開獎資料"""
+    return open_archive(path).draws()
+
+if __name__ == '__main__':
+    import sys
+
+    # python draw_archive.py import|export [資料檔 ...]
+    command = sys.argv[1] if len(sys.argv) > 1 else 'import'
+    paths = sys.argv[2:] or ['data/BigLotto.json', 'data/SuperLotto.json', 'data/DailyCash.json']
+    for path in paths:
+        if command == 'import':
+            if not os.path.exists(path):
+                print(f'{path} 不存在，略過')
+                continue
+            archive = import_json(path)
+            print(f'{path} → {archive.path}（{len(archive)} 期）')
+        elif command == 'export':
+            json_path = export_json(archive_path(path), path)
+            print(f'{archive_path(path)} → {json_path}')
+        else:
+            print(f'未知的指令: {command}')
+            sys.exit(1)
@@ -0,0 +1,98 @@
+from functools import lru_cache
+import numpy as np
+from db import DB_PATH, dataset_version, read_connection
+from draw_snapshot import load_snapshot
+from draw_window import get_table_config
+
+# 以號碼為主的查詢優先由欄位快照的號碼矩陣計算；快照尚未建立時改查 draw_numbers 資料表，
+# 查詢都落在索引範圍內，不需掃描 num1..num6
+
+def _window_seqs(cursor, table, periods):
+    # 最近 periods 期的期數（由新到舊），只讀取主鍵索引
+    cursor.execute('''
+        SELECT draw_seq FROM draw_numbers
+        WHERE game = ? AND position = 1
+        ORDER BY draw_seq DESC
+        LIMIT ?
+    ''', (table, max(0, periods)))
+    return [row[0] for row in cursor.fetchall()]
+
+def _window_start(snapshot, periods):
+    # 快照由舊到新，最近 periods 期為最後 periods 列
+    return max(0, len(snapshot) - max(0, periods))
+
+def _snapshot_appearances(snapshot, periods):
+    window = snapshot.numbers[_window_start(snapshot, periods):][::-1]
+    if not len(window):
+        return {}
+
+    # 穩定排序後同一號碼的元素相鄰，且維持由新到舊的期數順序
+    flat = window.ravel()
+    order = np.argsort(flat, kind='stable')
+    numbers = flat[order]
+    rows = order // window.shape[1]
+    bounds = np.flatnonzero(np.diff(numbers)) + 1
+    appearances = {}
+    for group, positions in zip(np.split(numbers, bounds), np.split(rows, bounds)):
+        appearances[int(group[0])] = tuple(positions.tolist())
+    return appearances
+
+@lru_cache(maxsize=32)
+def _load_appearances(lottery_type, periods, path, version):
+    snapshot = load_snapshot(lottery_type, path)
+    if snapshot is not None:
+        return _snapshot_appearances(snapshot, periods)
+
+    table = get_table_config(lottery_type)['table']
+    with read_connection(path) as conn:
+        cursor = conn.cursor()
+        seqs = _window_seqs(cursor, table, periods)
+        if not seqs:
+            return {}
+
+        # 沿主鍵由新到舊讀取觀察期內的號碼，不需額外排序
+        cursor.execute('''
+            SELECT number, draw_seq FROM draw_numbers
+            WHERE game = ? AND draw_seq >= ?
+            ORDER BY draw_seq DESC
+        ''', (table, seqs[-1]))
+        rows = cursor.fetchall()
+
+    index = {seq: i for i, seq in enumerate(seqs)}
+    appearances = {}
+    # 依期數由新到舊加入，每個號碼的位置維持遞增
+    for number, seq in rows:
+        appearances.setdefault(number, []).append(index[seq])
+    return {number: tuple(positions) for number, positions in appearances.items()}
+
+def number_appearances(lottery_type, periods, path=DB_PATH):
+    """最近 periods 期中每個號碼出現在第幾期前（0 為最新一期，由新到舊），未出現的號碼不在結果中"""
+    return _load_appearances(lottery_type, periods, path, dataset_version(path))
+
+def number_frequency(lottery_type, periods, path=DB_PATH):
+    """最近 periods 期中每個號碼的出現次數"""
+    return {number: len(positions) for number, positions in number_appearances(lottery_type, periods, path).items()}
+
+def draws_with_number(lottery_type, number, periods=None, path=DB_PATH):
+    """開出號碼 number 的期數（由新到舊），periods 可限制只看最近幾期"""
+    snapshot = load_snapshot(lottery_type, path)
+    if snapshot is not None:
+        start = 0 if periods is None else _window_start(snapshot, periods)
+        hits = (snapshot.numbers[start:] == number).any(axis=1)
+        return [str(term) for term in snapshot.term[start:][hits][::-1].tolist()]
+
+    table = get_table_config(lottery_type)['table']
+    with read_connection(path) as conn:
+        cursor = conn.cursor()
+        start = 0
+        if periods is not None:
+            seqs = _window_seqs(cursor, table, periods)
+            if not seqs:
+                return []
+            start = seqs[-1]
+        cursor.execute('''
+            SELECT draw_seq FROM draw_numbers
+            WHERE game = ? AND number = ? AND draw_seq >= ?
+            ORDER BY draw_seq DESC
+        ''', (table, number, start))
+        return [str(row[0]) for row in cursor.fetchall()]
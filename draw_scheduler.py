@@ -0,0 +1,135 @@
+import os
+import logging
+import threading
+from datetime import datetime, time, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+# 台灣沒有日光節約時間，固定為 UTC+8
+TAIPEI = timezone(timedelta(hours=8), 'Asia/Taipei')
+
+# 各彩種的開獎星期（星期一為 0）
+DRAW_WEEKDAYS = {
+    'big_lotto': (1, 4),
+    'super_lotto': (0, 3),
+    'daily_cash': (0, 1, 2, 3, 4, 5)
+}
+
+# 開獎時間約為晚上 8:30，開獎後稍等再開始檢查
+DRAW_TIME = time(20, 30)
+POLL_DELAY = timedelta(minutes=15)
+
+# 尚未出現新期數時的重試間隔（每次加倍，最長 30 分鐘），超過 GIVE_UP_AFTER 則等下一次開獎
+RETRY_INTERVAL = timedelta(minutes=5)
+MAX_RETRY_INTERVAL = timedelta(minutes=30)
+GIVE_UP_AFTER = timedelta(hours=4)
+
+def next_draw_time(table, after):
+    """彩種在 after 之後的下一次開獎時間"""
+    after = after.astimezone(TAIPEI)
+    for days in range(8):
+        day = after.date() + timedelta(days=days)
+        draw_time = datetime.combine(day, DRAW_TIME, TAIPEI)
+        if day.weekday() in DRAW_WEEKDAYS[table] and draw_time > after:
+            return draw_time
+    raise ValueError(f'{table} 沒有開獎日')
+
+def roc_date(moment):
+    """將日期轉為與開獎資料相同的民國日期字串，例如 114/02/28"""
+    return f'{moment.year - 1911}/{moment.month:02d}/{moment.day:02d}'
+
+class DrawScheduler(threading.Thread):
+    """依各彩種的開獎日程在開獎後檢查新期數，出現新期數前以遞增的間隔重試，找到後即增量寫入數據庫
+
+    每次檢查只會執行一次增量更新（通常只請求當月的資料），不需要定時完整爬取。
+    """
+
+    def __init__(self, games=None, now=None):
+        super().__init__(name='draw-scheduler', daemon=True)
+        from Lotto_Crawler import LOTTO_GAMES
+
+        self.games = games or LOTTO_GAMES
+        # 可替換目前時間，方便測試
+        self.now = now or (lambda: datetime.now(TAIPEI))
+        self._stop_event = threading.Event()
+
+        # 每個彩種正在等待的開獎時間、下次檢查時間與已重試次數
+        # 啟動時往前回溯，開獎後才啟動的服務仍會補上當天的開獎
+        start = self.now() - GIVE_UP_AFTER
+        self.pending = {}
+        for name, lotto_class, table in self.games:
+            draw_time = next_draw_time(table, start)
+            self.pending[table] = {'draw_time': draw_time, 'poll_at': draw_time + POLL_DELAY, 'attempts': 0}
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        logger.info('開獎排程已啟動')
+        while not self._stop_event.is_set():
+            table, state = min(self.pending.items(), key=lambda item: item[1]['poll_at'])
+            wait = (state['poll_at'] - self.now()).total_seconds()
+            if wait > 0:
+                # 等到下一次檢查時間，停止時立即結束
+                if self._stop_event.wait(min(wait, 3600)):
+                    break
+                continue
+            try:
+                self.poll(table)
+            except Exception:
+                logger.exception(f'{table} 檢查新期數時發生錯誤')
+                state['poll_at'] = self.now() + RETRY_INTERVAL
+        logger.info('開獎排程已停止')
+
+    def poll(self, table):
+        """檢查彩種是否已有本次開獎的資料，回傳是否已取得"""
+        from Lotto_Crawler import update_lotto
+
+        state = self.pending[table]
+        name, lotto_class, table = next(game for game in self.games if game[2] == table)
+        # 爬取到本次開獎所在的月份，最新一期在上個月時也能取得跨月的新期數
+        result = update_lotto(name, lotto_class, table, until=state['draw_time'])
+
+        found = result['latest_date'] is not None and result['latest_date'] >= roc_date(state['draw_time'])
+        now = self.now()
+        if found or now - state['draw_time'] >= GIVE_UP_AFTER:
+            if found:
+                logger.info(f'{name}已取得 {result["latest"]} 期，新增 {result["added"]} 期')
+            else:
+                logger.warning(f'{name}在 {state["draw_time"]:%Y-%m-%d %H:%M} 開獎後仍未取得新期數，等待下一次開獎')
+            # 排定下一次開獎
+            draw_time = next_draw_time(table, state['draw_time'])
+            self.pending[table] = {'draw_time': draw_time, 'poll_at': draw_time + POLL_DELAY, 'attempts': 0}
+        else:
+            state['attempts'] += 1
+            interval = min(RETRY_INTERVAL * (2 ** (state['attempts'] - 1)), MAX_RETRY_INTERVAL)
+            state['poll_at'] = now + interval
+            logger.info(f'{name}尚未出現新期數，{interval.total_seconds() / 60:.0f} 分鐘後重試')
+        return found
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def start_scheduler():
+    """啟動背景開獎排程，同一個行程只會啟動一次"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None or not _scheduler.is_alive():
+            _scheduler = DrawScheduler()
+            _scheduler.start()
+        return _scheduler
+
+def scheduler_enabled():
+    """設定環境變數 LOTTO_SCHEDULER=1 時在網站行程中啟動排程"""
+    return os.environ.get('LOTTO_SCHEDULER') == '1'
+
+if __name__ == '__main__':
+    # 以獨立行程執行排程：python draw_scheduler.py
+    logging.basicConfig(level=logging.INFO)
+    scheduler = start_scheduler()
+    for table, state in sorted(scheduler.pending.items(), key=lambda item: item[1]['poll_at']):
+        logger.info(f'{table} 下次開獎 {state["draw_time"]:%Y-%m-%d %H:%M}，{state["poll_at"]:%H:%M} 開始檢查')
+    try:
+        scheduler.join()
+    except KeyboardInterrupt:
+        scheduler.stop()
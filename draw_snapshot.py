@@ -0,0 +1,157 @@
+import os
+import json
+import shutil
+from functools import lru_cache
+import numpy as np
+from db import DB_PATH, dataset_version, read_connection
+from draw_window import LOTTERY_TABLES, numbers_to_masks
+
+# 各欄位的檔案與資料型別，每個欄位是一個可直接 np.memmap 的原始陣列檔（由舊到新）
+COLUMNS = {
+    'term': np.uint32,
+    'day': np.int32,
+    'numbers': np.uint8,
+    'special': np.uint8,
+    'mask': np.uint64,
+    # 累計出現次數表，見 occurrence_table.OccurrenceTable
+    'cumulative': np.int32,
+    'last_index': np.int64
+}
+
+def snapshot_path(db_path=DB_PATH):
+    """欄位快照目錄與資料庫放在同一個目錄"""
+    return os.path.splitext(db_path)[0] + '.snapshot'
+
+class DrawSnapshot:
+    """彩種所有開獎的欄位快照（由舊到新），陣列為唯讀的記憶體映射，多個行程可共用同一份頁面
+
+    numbers 為期數 × 號碼的 uint8 矩陣，special 為特別號（無特別號的彩種為 None），
+    day 為 1970-01-01 起算的開獎日數，mask 為每期號碼的 uint64 位元遮罩。
+    cumulative 與 last_index 為累計出現次數表的陣列，舊版快照沒有時為 None。
+    """
+
+    def __init__(self, lottery_type, term, day, numbers, special, mask, cumulative=None, last_index=None):
+        self.lottery_type = lottery_type
+        self.term = term
+        self.day = day
+        self.numbers = numbers
+        self.special = special
+        self.mask = mask
+        self.cumulative = cumulative
+        self.last_index = last_index
+
+    def __len__(self):
+        return len(self.term)
+
+    def term_strings(self):
+        return [str(term) for term in self.term.tolist()]
+
+def _write_column(directory, table, name, array):
+    array = np.ascontiguousarray(array, dtype=COLUMNS[name])
+    filename = f'{table}.{name}'
+    array.tofile(os.path.join(directory, filename))
+    return {'file': filename, 'dtype': np.dtype(COLUMNS[name]).name, 'shape': list(array.shape)}
+
+def build_snapshots(db_path=DB_PATH, path=None):
+    """依資料庫內容寫出所有彩種的欄位快照，預設存放於資料庫旁
+
+    每次寫入新的子目錄，最後以替換 manifest.json 切換，讀取端不會讀到寫到一半的檔案；
+    只保留目前與前一版的子目錄，仍在讀取前一版的行程不受影響。
+    """
+    from occurrence_table import OccurrenceTable
+
+    path = path or snapshot_path(db_path)
+    version = dataset_version(db_path)
+    generation = '-'.join(str(part) for part in version)
+    directory = os.path.join(path, generation)
+    os.makedirs(directory, exist_ok=True)
+
+    games = {}
+    with read_connection(db_path) as conn:
+        for lottery_type, config in LOTTERY_TABLES.items():
+            table = config['table']
+            columns = ', '.join(f'num{i}' for i in range(1, config['numbers'] + 1))
+            if config['special']:
+                columns += ', special_num'
+            cursor = conn.cursor()
+            cursor.execute(f'SELECT draw_term, draw_day, {columns} FROM {table} ORDER BY draw_term')
+            rows = cursor.fetchall()
+
+            values = np.array([row[2:] for row in rows], dtype=np.uint8)
+            values = values.reshape(len(rows), config['numbers'] + (1 if config['special'] else 0))
+            numbers = values[:, :config['numbers']]
+            terms = [int(row[0]) for row in rows]
+            occurrence = OccurrenceTable.from_numbers(terms, numbers, config['max_number'])
+            game = {
+                'count': len(rows),
+                'columns': {
+                    'term': _write_column(directory, table, 'term', terms),
+                    'day': _write_column(directory, table, 'day', [row[1] for row in rows]),
+                    'numbers': _write_column(directory, table, 'numbers', numbers),
+                    'mask': _write_column(directory, table, 'mask', numbers_to_masks(numbers)),
+                    'cumulative': _write_column(directory, table, 'cumulative', occurrence.cumulative),
+                    'last_index': _write_column(directory, table, 'last_index', occurrence.last_index)
+                }
+            }
+            if config['special']:
+                game['columns']['special'] = _write_column(directory, table, 'special', values[:, config['numbers']])
+            games[table] = game
+
+    manifest_path = os.path.join(path, 'manifest.json')
+    previous = _read_manifest(path)
+    manifest = {'version': list(version), 'directory': generation, 'games': games}
+    temp_path = manifest_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as fp:
+        json.dump(manifest, fp, ensure_ascii=False, indent=2)
+    os.replace(temp_path, manifest_path)
+
+    keep = {generation, previous['directory'] if previous else None}
+    for name in os.listdir(path):
+        if name not in keep and os.path.isdir(os.path.join(path, name)):
+            shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+    return path
+
+def _read_manifest(path):
+    try:
+        with open(os.path.join(path, 'manifest.json'), 'r', encoding='utf-8') as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return None
+
+def snapshot_current(db_path=DB_PATH):
+    """欄位快照是否對應資料庫目前的內容"""
+    manifest = _read_manifest(snapshot_path(db_path))
+    version = dataset_version(db_path)
+    return manifest is not None and version is not None and tuple(manifest['version']) == version
+
+def _map_column(directory, column):
+    shape = tuple(column['shape'])
+    if 0 in shape:
+        # 空檔案無法映射
+        return np.zeros(shape, dtype=column['dtype'])
+    return np.memmap(os.path.join(directory, column['file']), dtype=column['dtype'], mode='r', shape=shape)
+
+@lru_cache(maxsize=8)
+def _load_snapshot(lottery_type, db_path, version):
+    path = snapshot_path(db_path)
+    manifest = _read_manifest(path)
+    if version is None or manifest is None or tuple(manifest['version']) != version:
+        return None
+
+    table = LOTTERY_TABLES[lottery_type]['table']
+    try:
+        game = manifest['games'][table]
+        directory = os.path.join(path, manifest['directory'])
+        columns = {name: _map_column(directory, column) for name, column in game['columns'].items()}
+    except (OSError, KeyError, ValueError):
+        return None
+    return DrawSnapshot(
+        lottery_type, columns['term'], columns['day'], columns['numbers'], columns.get('special'), columns['mask'],
+        columns.get('cumulative'), columns.get('last_index')
+    )
+
+def load_snapshot(lottery_type, db_path=DB_PATH):
+    """取得彩種目前資料版本的欄位快照，快照尚未建立或已過期時為 None"""
+    if lottery_type not in LOTTERY_TABLES:
+        lottery_type = 'daily-cash'
+    return _load_snapshot(lottery_type, db_path, dataset_version(db_path))
@@ -0,0 +1,99 @@
+from bisect import bisect_left, bisect_right
+from collections.abc import MutableMapping
+
+def date_key(date):
+    """將 '114/02/28' 格式的開獎日期轉為可比較的 (年, 月, 日)"""
+    if isinstance(date, str):
+        return tuple(int(part) for part in date.split('/'))
+    return tuple(date)
+
+class DrawStore(MutableMapping):
+    """依期數排序的開獎資料，以期數字串為鍵，用法與 dict 相同
+
+    最新與最早一期直接取排序清單的兩端，期數與日期的查詢及範圍切片以二分搜尋完成，
+    不需要每次重新排序。新的期數通常接在結尾，插入只需附加。
+    """
+
+    def __init__(self, draws=()):
+        self._draws = {}
+        # 依期數排序的期數（整數）與對應的開獎日期，兩個清單的順序一致
+        self._terms = []
+        self._dates = []
+        for draw in draws:
+            self[draw['draw']] = draw
+
+    def __getitem__(self, term):
+        return self._draws[str(term)]
+
+    def __setitem__(self, term, draw):
+        term = str(term)
+        if term in self._draws:
+            index = bisect_left(self._terms, int(term))
+            self._dates[index] = date_key(draw['date'])
+        elif not self._terms or int(term) > self._terms[-1]:
+            self._terms.append(int(term))
+            self._dates.append(date_key(draw['date']))
+        else:
+            index = bisect_left(self._terms, int(term))
+            self._terms.insert(index, int(term))
+            self._dates.insert(index, date_key(draw['date']))
+        self._draws[term] = draw
+
+    def __delitem__(self, term):
+        term = str(term)
+        del self._draws[term]
+        index = bisect_left(self._terms, int(term))
+        del self._terms[index]
+        del self._dates[index]
+
+    def __iter__(self):
+        return (str(term) for term in self._terms)
+
+    def __reversed__(self):
+        return (str(term) for term in reversed(self._terms))
+
+    def __len__(self):
+        return len(self._terms)
+
+    def __contains__(self, term):
+        return str(term) in self._draws
+
+    def merge(self, draws):
+        """一次加入多期開獎，已存在的期數保留原資料，最後只重新排序一次"""
+        for draw in draws:
+            self._draws.setdefault(str(draw['draw']), draw)
+        self._terms = sorted(int(term) for term in self._draws)
+        self._dates = [date_key(self._draws[str(term)]['date']) for term in self._terms]
+
+    def latest(self):
+        """最新一期，沒有資料時為 None"""
+        return self._draws[str(self._terms[-1])] if self._terms else None
+
+    def first(self):
+        """最早一期，沒有資料時為 None"""
+        return self._draws[str(self._terms[0])] if self._terms else None
+
+    def latest_n(self, count):
+        """最近 count 期（由新到舊）"""
+        return self._slice(max(0, len(self._terms) - max(0, count)), len(self._terms))[::-1]
+
+    def by_date(self, date):
+        """開獎日期為 date 的期數"""
+        key = date_key(date)
+        return self._slice(bisect_left(self._dates, key), bisect_right(self._dates, key))
+
+    def term_range(self, start_term, end_term):
+        """期數介於 start_term 與 end_term（含）之間的開獎（由舊到新）"""
+        return self._slice(bisect_left(self._terms, int(start_term)), bisect_right(self._terms, int(end_term)))
+
+    def date_range(self, start_date, end_date):
+        """開獎日期介於 start_date 與 end_date（含）之間的開獎（由舊到新）"""
+        return self._slice(bisect_left(self._dates, date_key(start_date)), bisect_right(self._dates, date_key(end_date)))
+
+    def sorted_items(self, reverse=False):
+        """依期數排序的 (期數, 開獎) 清單"""
+        terms = reversed(self._terms) if reverse else self._terms
+        return [(str(term), self._draws[str(term)]) for term in terms]
+
+    def _slice(self, start, end):
+        return [self._draws[str(term)] for term in self._terms[start:end]]
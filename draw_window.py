@@ -0,0 +1,140 @@
+import threading
+from functools import lru_cache
+import numpy as np
+from db import DB_PATH, dataset_version, read_connection
+
+# 各彩種對應的資料表與號碼設定
+LOTTERY_TABLES = {
+    'big-lotto': {'table': 'big_lotto', 'numbers': 6, 'max_number': 49, 'special': True},
+    'super-lotto': {'table': 'super_lotto', 'numbers': 6, 'max_number': 38, 'special': True},
+    'daily-cash': {'table': 'daily_cash', 'numbers': 5, 'max_number': 39, 'special': False}
+}
+
+def get_table_config(lottery_type):
+    """取得彩種的資料表設定，未知彩種沿用今彩539的設定"""
+    return LOTTERY_TABLES.get(lottery_type, LOTTERY_TABLES['daily-cash'])
+
+class DrawWindow:
+    """最近 N 期開獎資料（由新到舊），以唯讀陣列保存，可安全地在多個分析之間共用"""
+
+    def __init__(self, lottery_type, terms, numbers, special=None, masks=None):
+        config = get_table_config(lottery_type)
+        self.lottery_type = lottery_type
+        self.table = config['table']
+        self.num_columns = config['numbers']
+        self.max_number = config['max_number']
+        self.terms = tuple(terms)
+        self.numbers = _readonly(numbers)
+        self.special = _readonly(special) if special is not None else None
+        # 以 Python 整數組成的每期號碼，供逐期比對的分析直接使用
+        self.rows = tuple(tuple(row) for row in self.numbers.tolist())
+        counts = np.bincount(self.numbers.ravel(), minlength=self.max_number + 1)
+        self.number_counts = _readonly(counts)
+        # 每期號碼編碼為 64 位元遮罩（第 n 位元代表號碼 n），交集即為位元 AND
+        self.masks = _readonly(masks if masks is not None else numbers_to_masks(self.numbers))
+
+    def __len__(self):
+        return len(self.terms)
+
+    def head(self, periods):
+        """取出最近 periods 期的子視窗（共用同一份陣列）"""
+        periods = max(0, periods)
+        return DrawWindow(
+            self.lottery_type,
+            self.terms[:periods],
+            self.numbers[:periods],
+            self.special[:periods] if self.special is not None else None,
+            self.masks[:periods]
+        )
+
+def numbers_to_masks(numbers):
+    """將開獎號碼矩陣（期數 × 號碼）轉為每期一個 uint64 位元遮罩"""
+    numbers = np.asarray(numbers, dtype=np.uint64)
+    bits = np.left_shift(np.uint64(1), numbers)
+    return np.bitwise_or.reduce(bits, axis=1) if len(numbers) else np.zeros(0, dtype=np.uint64)
+
+def mask_to_numbers(mask):
+    """將位元遮罩還原為由小到大排序的號碼"""
+    mask = int(mask)
+    return tuple(n for n in range(mask.bit_length()) if mask >> n & 1)
+
+def _readonly(array):
+    array = np.asarray(array)
+    array.setflags(write=False)
+    return array
+
+def _snapshot_history(lottery_type, path):
+    # 欄位快照由舊到新，反轉後即為由新到舊的視圖，不需複製陣列
+    from draw_snapshot import load_snapshot
+
+    snapshot = load_snapshot(lottery_type, path)
+    if snapshot is None:
+        return None
+    return DrawWindow(
+        lottery_type,
+        snapshot.term_strings()[::-1],
+        snapshot.numbers[::-1],
+        snapshot.special[::-1] if snapshot.special is not None else None,
+        snapshot.mask[::-1]
+    )
+
+def _fetch_history(lottery_type, path):
+    history = _snapshot_history(lottery_type, path)
+    if history is not None:
+        return history
+
+    config = get_table_config(lottery_type)
+    columns = ', '.join(f'num{i}' for i in range(1, config['numbers'] + 1))
+    if config['special']:
+        columns += ', special_num'
+
+    with read_connection(path) as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT draw_term, {columns}
+            FROM {config['table']}
+            ORDER BY draw_term DESC
+        ''')
+        draws = cursor.fetchall()
+
+    values = np.array([draw[1:] for draw in draws], dtype=np.uint8)
+    values = values.reshape(len(draws), config['numbers'] + (1 if config['special'] else 0))
+    return DrawWindow(
+        lottery_type,
+        [draw[0] for draw in draws],
+        values[:, :config['numbers']],
+        values[:, config['numbers']] if config['special'] else None
+    )
+
+@lru_cache(maxsize=8)
+def _load_history(lottery_type, path, version):
+    return _fetch_history(lottery_type, path)
+
+@lru_cache(maxsize=64)
+def _load_window(lottery_type, periods, path, version):
+    return _load_history(lottery_type, path, version).head(periods)
+
+_version_lock = threading.Lock()
+_cached_versions = {}
+
+def _current_version(path):
+    version = dataset_version(path)
+    with _version_lock:
+        if _cached_versions.get(path, version) != version:
+            # 資料已更新，舊版本的快取不再使用
+            clear_cache()
+        _cached_versions[path] = version
+    return version
+
+def load_draw_window(lottery_type, periods, path=DB_PATH):
+    """取得最近 periods 期的開獎資料，同一資料版本內只讀取資料庫一次"""
+    return _load_window(lottery_type, periods, path, _current_version(path))
+
+def load_draw_history(lottery_type, path=DB_PATH):
+    """取得完整的開獎歷史（由新到舊）"""
+    return _load_history(lottery_type, path, _current_version(path))
+
+def clear_cache():
+    """清除所有開獎資料快取"""
+    _load_window.cache_clear()
+    _load_history.cache_clear()
@@ -0,0 +1,29 @@
+import gc
+import os
+import multiprocessing
+
+# 使用方式: gunicorn
+# 主行程先載入應用、pandas/scikit-learn 與所有開獎資料後才 fork，worker 以寫入時複製共用同一份記憶體，
+# 增加 worker 數時每個 worker 的常駐記憶體不會隨之增加
+wsgi_app = 'app:create_app(replica=False, preload=True)'
+preload_app = True
+
+bind = os.environ.get('LOTTO_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('LOTTO_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+# 訓練模型的請求需要較長時間
+timeout = 120
+
+# 各 worker 不另外載入資料庫的記憶體副本，以記憶體映射讀取 lottery.db，所有 worker 共用作業系統的頁面快取
+# 匯入後各 worker 改映射新一版欄位快照（含累計出現次數表）的檔案，仍共用同一份頁面，不需重新啟動 worker
+# 訓練好的預測模型寫入 lottery.model.pkl，預測請求落在其他 worker 時讀取同一份模型
+# 開獎排程請以獨立行程執行（python draw_scheduler.py），避免每個 worker 各自爬取
+
+def pre_fork(server, worker):
+    # 將預先載入的物件移出垃圾回收的追蹤範圍，避免 worker 執行回收時改寫這些物件所在的頁面而複製整頁
+    gc.freeze()
+
+def post_fork(server, worker):
+    # 主行程的 SQLite 連線不可在 worker 中使用，確保 worker 從空的連線池開始
+    from db import close_connections
+
+    close_connections()
@@ -1,65 +1,31 @@
-import sqlite3
+import numpy as np
+from draw_window import load_draw_window, mask_to_numbers
+from occurrence_table import load_occurrence_table
 
 def analyze_lottery(lottery_type, periods):
-    conn = sqlite3.connect('lottery.db')
-    cursor = conn.cursor()
-    
     # 根據彩券類型設定參數
     if lottery_type == 'big-lotto':
-        table = 'big_lotto'
         max_number = 49
-        num_columns = 6
     elif lottery_type == 'super-lotto':
-        table = 'super_lotto'
         max_number = 38
-        num_columns = 6
     else:  # daily-cash
-        table = 'daily_cash'
         max_number = 39
-        num_columns = 5
     
-    # 定義要查詢的欄位
-    columns = [f'num{i}' for i in range(1, num_columns + 1)]
-    column_str = ', '.join(columns)
-    
-    # 獲取分析範圍內的所有期數，按照時間順序排列
-    cursor.execute(f'''
-        SELECT draw_term, {column_str}
-        FROM {table} 
-        ORDER BY draw_term DESC 
-        LIMIT {periods}
-    ''')
-    draws = cursor.fetchall()
+    # 由累計出現次數表直接取得最近N期的出現次數與遺漏期數，成本不隨期數增加
+    table = load_occurrence_table(lottery_type)
+    frequencies = table.frequency(periods)
+    missing = table.missing_periods(periods)
     
     # 準備分析結果
     results = {}
     for num in range(1, max_number + 1):
-        # 計算出現次數
-        placeholders = ' OR '.join([f'{col}=?' for col in columns])
-        cursor.execute(f'''
-            SELECT COUNT(*) 
-            FROM (
-                SELECT * FROM {table} 
-                ORDER BY draw_term DESC 
-                LIMIT ?
-            )
-            WHERE {placeholders}
-        ''', [periods] + [num] * num_columns)
-        frequency = cursor.fetchone()[0]
-        
-        # 計算最近開出期數和遺漏期數
-        missing_periods = 0
-        last_drawn_term = '未開出'
+        frequency = int(frequencies[num])
+        missing_periods = int(missing[num])
         
-        # 遍歷最近N期的開獎號碼
-        for i, draw in enumerate(draws):
-            draw_numbers = draw[1:]  # 第一個元素是期數
-            if num in draw_numbers:
-                missing_periods = i
-                last_drawn_term = draw[0]
-                break
+        if missing_periods < periods:
+            last_drawn_term = table.last_drawn_term(num)
         else:
-            missing_periods = periods
+            last_drawn_term = '未開出'
         
         results[num] = {
             'frequency': frequency,
@@ -68,45 +34,22 @@ def analyze_lottery(lottery_type, periods):
             'last_drawn': str(last_drawn_term)
         }
     
-    conn.close()
     return results 
 
 def analyze_repeat_numbers(lottery_type, periods=50):
-    conn = sqlite3.connect('lottery.db')
-    cursor = conn.cursor()
-    
-    # 根據彩券類型設定參數
-    if lottery_type == 'big-lotto':
-        table = 'big_lotto'
-        num_columns = 6
-    elif lottery_type == 'super-lotto':
-        table = 'super_lotto'
-        num_columns = 6
-    else:  # daily-cash
-        table = 'daily_cash'
-        num_columns = 5
-        
     # 獲取最近N期的開獎號碼
-    columns = [f'num{i}' for i in range(1, num_columns + 1)]
-    column_str = ', '.join(columns)
-    
-    cursor.execute(f'''
-        SELECT draw_term, {column_str}
-        FROM {table}
-        ORDER BY draw_term DESC
-        LIMIT {periods}
-    ''')
-    draws = cursor.fetchall()
+    window = load_draw_window(lottery_type, periods)
+    draws = window.rows
     
     # 轉換每期號碼為集合，方便比較
-    draw_sets = [set(draw[1:]) for draw in draws]
+    draw_sets = [set(draw) for draw in draws]
     
     # 分析每個號碼的重複情況
     results = {}
     
     # 遍歷每一期
     for i in range(len(draws)):
-        current_draw = set(draws[i][1:])
+        current_draw = draw_sets[i]
         
         # 與上一期比較
         last_draw_repeat = set()
@@ -144,22 +87,11 @@ def analyze_repeat_numbers(lottery_type, periods=50):
     
     # 修改計算期數內最常重複的次數的邏輯
     for num in results:
-        cursor.execute(f'''
-            WITH recent_draws AS (
-                SELECT * FROM {table}
-                ORDER BY draw_term DESC
-                LIMIT ?
-            )
-            SELECT COUNT(*) 
-            FROM recent_draws
-            WHERE {' OR '.join([f'{col}=?' for col in columns])}
-        ''', [periods] + [num] * num_columns)
-        total_appearances = cursor.fetchone()[0]
+        total_appearances = int(window.number_counts[num])
         
         # 計算實際重複次數（出現次數減1就是重複次數）
         results[num]['most_repeated'] = max(0, total_appearances - 1)
     
-    conn.close()
     return results 
 
 def get_zodiac_year():
@@ -181,12 +113,8 @@ def get_zodiac_year():
     return zodiac_numbers
 
 def analyze_special_numbers(lottery_type, periods=50):
-    conn = sqlite3.connect('lottery.db')
-    cursor = conn.cursor()
-    
     # 根據彩券類型設定參數
     if lottery_type == 'big-lotto':  # 大樂透 1-49
-        table = 'big_lotto'
         num_columns = 6
         max_number = 49
         zodiac_numbers = get_zodiac_year()  # 原有的生肖對應表
@@ -199,7 +127,6 @@ def analyze_special_numbers(lottery_type, periods=50):
         }
         
     elif lottery_type == 'super-lotto':  # 威力彩第一區 1-38
-        table = 'super_lotto'
         num_columns = 6
         max_number = 38
         # 修改生肖對應表只包含1-38
@@ -214,7 +141,6 @@ def analyze_special_numbers(lottery_type, periods=50):
         }
         
     else:  # 今彩539 1-39
-        table = 'daily_cash'
         num_columns = 5
         max_number = 39
         # 修改生肖對應表只包含1-39
@@ -229,16 +155,7 @@ def analyze_special_numbers(lottery_type, periods=50):
         }
     
     # 獲取最近N期的開獎號碼
-    columns = [f'num{i}' for i in range(1, num_columns + 1)]
-    column_str = ', '.join(columns)
-    
-    cursor.execute(f'''
-        SELECT {column_str}
-        FROM {table}
-        ORDER BY draw_term DESC
-        LIMIT {periods}
-    ''')
-    draws = cursor.fetchall()
+    draws = load_draw_window(lottery_type, periods).rows
     
     # 先計算數字特性的範圍
     prime_numbers = [n for n in range(2, max_number + 1) if is_prime(n)]
@@ -314,7 +231,6 @@ def analyze_special_numbers(lottery_type, periods=50):
     for number_type in results['numbers']:
         results['numbers'][number_type]['rate'] = round(results['numbers'][number_type]['count'] / total_numbers * 100, 2)
     
-    conn.close()
     return results
 
 def is_prime(n):
@@ -326,34 +242,19 @@ def is_prime(n):
     return True 
 
 def analyze_combination_numbers(lottery_type, periods=50):
-    conn = sqlite3.connect('lottery.db')
-    cursor = conn.cursor()
-    
     # 根據彩券類型設定參數
     if lottery_type == 'big-lotto':
-        table = 'big_lotto'
         num_columns = 6
         max_number = 49
     elif lottery_type == 'super-lotto':
-        table = 'super_lotto'
         num_columns = 6
         max_number = 38
     else:  # daily-cash
-        table = 'daily_cash'
         num_columns = 5
         max_number = 39
     
     # 獲取最近N期的開獎號碼
-    columns = [f'num{i}' for i in range(1, num_columns + 1)]
-    column_str = ', '.join(columns)
-    
-    cursor.execute(f'''
-        SELECT {column_str}
-        FROM {table}
-        ORDER BY draw_term DESC
-        LIMIT {periods}
-    ''')
-    draws = cursor.fetchall()
+    draws = load_draw_window(lottery_type, periods).rows
     
     # 初始化結果
     results = {
@@ -437,61 +338,32 @@ def analyze_combination_numbers(lottery_type, periods=50):
         for combo, count in popular_combinations
     ]
     
-    conn.close()
     return results 
 
 def analyze_prediction_numbers(lottery_type, periods=50):
-    conn = sqlite3.connect('lottery.db')
-    cursor = conn.cursor()
-    
     # 根據彩券類型設定參數
     if lottery_type == 'big-lotto':
-        table = 'big_lotto'
         num_columns = 6
         max_number = 49
     elif lottery_type == 'super-lotto':
-        table = 'super_lotto'
         num_columns = 6
         max_number = 38
     else:  # daily-cash
-        table = 'daily_cash'
         num_columns = 5
         max_number = 39
     
-    # 獲取最近N期的開獎號碼
-    columns = [f'num{i}' for i in range(1, num_columns + 1)]
-    column_str = ', '.join(columns)
-    
-    cursor.execute(f'''
-        SELECT {column_str}
-        FROM {table}
-        ORDER BY draw_term DESC
-        LIMIT {periods}
-    ''')
-    draws = cursor.fetchall()
-    
-    # 統計每個號碼的出現次數和遺漏期數
+    # 由累計出現次數表取得每個號碼的出現次數和遺漏期數
+    table = load_occurrence_table(lottery_type)
+    frequencies = table.frequency(periods)
+    missing = table.missing_periods(periods)
+    
     number_stats = {}
     for i in range(1, max_number + 1):
         number_stats[i] = {
-            'frequency': 0,
-            'missing_periods': 0
+            'frequency': int(frequencies[i]),
+            'missing_periods': int(missing[i])
         }
     
-    # 計算頻率和遺漏期數
-    for draw in draws:
-        for num in draw:
-            number_stats[num]['frequency'] += 1
-    
-    # 計算遺漏期數
-    for i in range(1, max_number + 1):
-        for j, draw in enumerate(draws):
-            if i in draw:
-                number_stats[i]['missing_periods'] = j
-                break
-            if j == len(draws) - 1:
-                number_stats[i]['missing_periods'] = periods
-    
     # 選出遺漏值最高的前6個號碼
     missing_numbers = sorted(
         [(num, stats['missing_periods']) for num, stats in number_stats.items()],
@@ -546,38 +418,22 @@ def analyze_prediction_numbers(lottery_type, periods=50):
         'suggested_combinations': suggested_combinations
     }
     
-    conn.close()
     return results 
 
 def analyze_route_numbers(lottery_type, periods=50):
-    conn = sqlite3.connect('lottery.db')
-    cursor = conn.cursor()
-    
     # 根據彩券類型設定參數
     if lottery_type == 'big-lotto':
-        table = 'big_lotto'
         num_columns = 6
         max_number = 49
     elif lottery_type == 'super-lotto':
-        table = 'super_lotto'
         num_columns = 6
         max_number = 38
     else:  # daily-cash
-        table = 'daily_cash'
         num_columns = 5
         max_number = 39
     
     # 獲取最近N期的開獎號碼
-    columns = [f'num{i}' for i in range(1, num_columns + 1)]
-    column_str = ', '.join(columns)
-    
-    cursor.execute(f'''
-        SELECT {column_str}
-        FROM {table}
-        ORDER BY draw_term DESC
-        LIMIT {periods}
-    ''')
-    draws = cursor.fetchall()
+    draws = load_draw_window(lottery_type, periods).rows
     
     # 初始化尾數分布統計
     digit_distribution = {str(i): {'count': 0, 'rate': 0, 'numbers': []} for i in range(10)}
@@ -660,38 +516,23 @@ def analyze_route_numbers(lottery_type, periods=50):
         'most_repeated_digits': most_repeated_digits
     }
     
-    conn.close()
     return results 
 
 def analyze_repetition_numbers(lottery_type, periods=50):
-    conn = sqlite3.connect('lottery.db')
-    cursor = conn.cursor()
-    
     # 根據彩券類型設定參數
     if lottery_type == 'big-lotto':
-        table = 'big_lotto'
         num_columns = 6
         max_number = 49
     elif lottery_type == 'super-lotto':
-        table = 'super_lotto'
         num_columns = 6
         max_number = 38
     else:  # daily-cash
-        table = 'daily_cash'
         num_columns = 5
         max_number = 39
     
     # 獲取最近N期的開獎號碼
-    columns = [f'num{i}' for i in range(1, num_columns + 1)]
-    column_str = ', '.join(columns)
-    
-    cursor.execute(f'''
-        SELECT {column_str}
-        FROM {table}
-        ORDER BY draw_term DESC
-        LIMIT {periods}
-    ''')
-    draws = cursor.fetchall()
+    window = load_draw_window(lottery_type, periods)
+    draws = window.rows
     
     # 分析相鄰期重複
     adjacent_repeat_count = 0
@@ -768,27 +609,23 @@ def analyze_repetition_numbers(lottery_type, periods=50):
     periodic_patterns.sort(key=lambda x: x['count'], reverse=True)
     periodic_patterns = periodic_patterns[:5]  # 只保留前5個最顯著的模式
     
-    # 分析重複組合
+    # 分析重複組合：以位元遮罩 AND 後計算位元數，一次比對該期與之後所有期數
+    masks = window.masks
     combination_repeats = {}
     for i in range(len(draws) - 1):
-        current_draw = set(draws[i])
+        common_masks = masks[i] & masks[i + 1:]
         
-        # 向後查找重複組合
-        for j in range(i + 1, len(draws)):
-            next_draw = set(draws[j])
-            common_numbers = current_draw & next_draw
-            
-            # 如果有4個或以上號碼相同
-            if len(common_numbers) >= 4:
-                common_numbers = tuple(sorted(common_numbers))
-                if common_numbers not in combination_repeats:
-                    combination_repeats[common_numbers] = {
-                        'count': 0,
-                        'intervals': [],
-                        'match_count': len(common_numbers)
-                    }
-                combination_repeats[common_numbers]['count'] += 1
-                combination_repeats[common_numbers]['intervals'].append(j - i)
+        # 如果有4個或以上號碼相同
+        for offset in np.flatnonzero(np.bitwise_count(common_masks) >= 4).tolist():
+            common_numbers = mask_to_numbers(common_masks[offset])
+            if common_numbers not in combination_repeats:
+                combination_repeats[common_numbers] = {
+                    'count': 0,
+                    'intervals': [],
+                    'match_count': len(common_numbers)
+                }
+            combination_repeats[common_numbers]['count'] += 1
+            combination_repeats[common_numbers]['intervals'].append(offset + 1)
     
     # 轉換重複組合為列表格式
     repeated_combinations = [
@@ -814,38 +651,22 @@ def analyze_repetition_numbers(lottery_type, periods=50):
         'repeated_combinations': repeated_combinations
     }
     
-    conn.close()
     return results 
 
 def analyze_consecutive_numbers(lottery_type, periods=50):
-    conn = sqlite3.connect('lottery.db')
-    cursor = conn.cursor()
-    
     # 根據彩券類型設定參數
     if lottery_type == 'big-lotto':
-        table = 'big_lotto'
         num_columns = 6
         max_number = 49
     elif lottery_type == 'super-lotto':
-        table = 'super_lotto'
         num_columns = 6
         max_number = 38
     else:  # daily-cash
-        table = 'daily_cash'
         num_columns = 5
         max_number = 39
     
     # 獲取最近N期的開獎號碼
-    columns = [f'num{i}' for i in range(1, num_columns + 1)]
-    column_str = ', '.join(columns)
-    
-    cursor.execute(f'''
-        SELECT {column_str}
-        FROM {table}
-        ORDER BY draw_term DESC
-        LIMIT {periods}
-    ''')
-    draws = cursor.fetchall()
+    draws = load_draw_window(lottery_type, periods).rows
     
     # 分析連號出現頻率
     consecutive_count = 0
@@ -979,38 +800,22 @@ def analyze_consecutive_numbers(lottery_type, periods=50):
         'popular_patterns': popular_patterns
     }
     
-    conn.close()
     return results 
 
 def analyze_numeric_numbers(lottery_type, periods=50):
-    conn = sqlite3.connect('lottery.db')
-    cursor = conn.cursor()
-    
     # 根據彩券類型設定參數
     if lottery_type == 'big-lotto':
-        table = 'big_lotto'
         num_columns = 6
         max_number = 49
     elif lottery_type == 'super-lotto':
-        table = 'super_lotto'
         num_columns = 6
         max_number = 38
     else:  # daily-cash
-        table = 'daily_cash'
         num_columns = 5
         max_number = 39
     
     # 獲取最近N期的開獎號碼
-    columns = [f'num{i}' for i in range(1, num_columns + 1)]
-    column_str = ', '.join(columns)
-    
-    cursor.execute(f'''
-        SELECT {column_str}
-        FROM {table}
-        ORDER BY draw_term DESC
-        LIMIT {periods}
-    ''')
-    draws = cursor.fetchall()
+    draws = load_draw_window(lottery_type, periods).rows
     
     # 定義質數、平方數和斐波那契數列
     def is_prime(n):
@@ -1087,38 +892,22 @@ def analyze_numeric_numbers(lottery_type, periods=50):
         }
     }
     
-    conn.close()
     return results 
 
 def analyze_distribution_numbers(lottery_type, periods=50):
-    conn = sqlite3.connect('lottery.db')
-    cursor = conn.cursor()
-    
     # 根據彩券類型設定參數
     if lottery_type == 'big-lotto':
-        table = 'big_lotto'
         num_columns = 6
         max_number = 49
     elif lottery_type == 'super-lotto':
-        table = 'super_lotto'
         num_columns = 6
         max_number = 38
     else:  # daily-cash
-        table = 'daily_cash'
         num_columns = 5
         max_number = 39
     
     # 獲取最近N期的開獎號碼
-    columns = [f'num{i}' for i in range(1, num_columns + 1)]
-    column_str = ', '.join(columns)
-    
-    cursor.execute(f'''
-        SELECT {column_str}
-        FROM {table}
-        ORDER BY draw_term DESC
-        LIMIT {periods}
-    ''')
-    draws = cursor.fetchall()
+    draws = load_draw_window(lottery_type, periods).rows
     
     # 區間分布分析
     range_size = 10
@@ -1216,5 +1005,32 @@ def analyze_distribution_numbers(lottery_type, periods=50):
         'cold_zones': cold_zones  # 修改後的冷區分析結果
     }
     
-    conn.close()
-    return results 
\ No newline at end of file
+    return results 
+
+# 綜合分析的區塊名稱與對應的分析函數
+ANALYSIS_SECTIONS = {
+    'frequency': analyze_lottery,
+    'repeat': analyze_repeat_numbers,
+    'special': analyze_special_numbers,
+    'combination': analyze_combination_numbers,
+    'prediction': analyze_prediction_numbers,
+    'route': analyze_route_numbers,
+    'repetition': analyze_repetition_numbers,
+    'consecutive': analyze_consecutive_numbers,
+    'numeric': analyze_numeric_numbers,
+    'distribution': analyze_distribution_numbers
+}
+
+def analyze_all(lottery_type, periods=50, sections=None):
+    """以同一份開獎資料計算全部（或指定區塊的）分析結果"""
+    if sections is None:
+        sections = list(ANALYSIS_SECTIONS)
+    
+    unknown = [section for section in sections if section not in ANALYSIS_SECTIONS]
+    if unknown:
+        raise ValueError(f'不支援的分析項目: {", ".join(unknown)}')
+    
+    # 先載入開獎資料，之後各項分析都從快取中取用同一份資料
+    load_draw_window(lottery_type, periods)
+    
+    return {section: ANALYSIS_SECTIONS[section](lottery_type, periods) for section in sections}
@@ -1,7 +1,9 @@
 import random
 from datetime import datetime
-import sqlite3
 import numpy as np
+from draw_window import load_draw_window
+from draw_numbers import number_appearances
+from occurrence_table import load_occurrence_table
 
 def get_lottery_config(lottery_type):
     """獲取彩券配置"""
@@ -67,27 +69,11 @@ def get_quick_picks(lottery_type, count=5):
 
 def get_hot_combinations(lottery_type, periods=50, count=5):
     """熱門號碼組合推薦"""
-    conn = sqlite3.connect('lottery.db')
-    cursor = conn.cursor()
     config = get_lottery_config(lottery_type)
     
-    # 獲取最近期數的熱門號碼
-    table_name = {
-        'big-lotto': 'big_lotto',
-        'super-lotto': 'super_lotto',
-        'daily-cash': 'daily_cash'
-    }[lottery_type]
-    
-    # 統計號碼出現頻率
-    number_counts = {}
-    for i in range(1, config['max_number'] + 1):
-        cursor.execute(f'''
-            SELECT COUNT(*) FROM (
-                SELECT * FROM {table_name} ORDER BY draw_term DESC LIMIT ?
-            ) WHERE num1=? OR num2=? OR num3=? OR num4=? OR num5=?
-            {' OR num6=?' if config['numbers'] == 6 else ''}
-        ''', [periods] + [i] * config['numbers'])
-        number_counts[i] = cursor.fetchone()[0]
+    # 由累計出現次數表取得最近期數的號碼出現頻率
+    counts = load_occurrence_table(lottery_type).frequency(periods)
+    number_counts = {i: int(counts[i]) for i in range(1, config['max_number'] + 1)}
     
     # 根據出現頻率排序
     sorted_numbers = sorted(number_counts.items(), key=lambda x: x[1], reverse=True)
@@ -106,32 +92,15 @@ def get_hot_combinations(lottery_type, periods=50, count=5):
             'confidence': random.randint(70, 95)
         })
     
-    conn.close()
     return results
 
 def get_cold_combinations(lottery_type, periods=50, count=5):
     """冷門號碼組合推薦"""
-    conn = sqlite3.connect('lottery.db')
-    cursor = conn.cursor()
     config = get_lottery_config(lottery_type)
     
-    # 獲取最近期數的冷門號碼
-    table_name = {
-        'big-lotto': 'big_lotto',
-        'super-lotto': 'super_lotto',
-        'daily-cash': 'daily_cash'
-    }[lottery_type]
-    
-    # 統計號碼出現頻率
-    number_counts = {}
-    for i in range(1, config['max_number'] + 1):
-        cursor.execute(f'''
-            SELECT COUNT(*) FROM (
-                SELECT * FROM {table_name} ORDER BY draw_term DESC LIMIT ?
-            ) WHERE num1=? OR num2=? OR num3=? OR num4=? OR num5=?
-            {' OR num6=?' if config['numbers'] == 6 else ''}
-        ''', [periods] + [i] * config['numbers'])
-        number_counts[i] = cursor.fetchone()[0]
+    # 由累計出現次數表取得最近期數的號碼出現頻率
+    counts = load_occurrence_table(lottery_type).frequency(periods)
+    number_counts = {i: int(counts[i]) for i in range(1, config['max_number'] + 1)}
     
     # 根據出現頻率排序（從低到高）
     sorted_numbers = sorted(number_counts.items(), key=lambda x: x[1])
@@ -150,29 +119,14 @@ def get_cold_combinations(lottery_type, periods=50, count=5):
             'confidence': random.randint(50, 75)  # 冷門號碼的信心指數較低
         })
     
-    conn.close()
     return results
 
 def get_balanced_combinations(lottery_type, periods=50, count=5):
     """平衡號碼組合推薦"""
-    conn = sqlite3.connect('lottery.db')
-    cursor = conn.cursor()
     config = get_lottery_config(lottery_type)
     
-    table_name = {
-        'big-lotto': 'big_lotto',
-        'super-lotto': 'super_lotto',
-        'daily-cash': 'daily_cash'
-    }[lottery_type]
-    
     # 分析歷史數據中的奇偶比例和大小比例
-    cursor.execute(f'''
-        SELECT num1, num2, num3, num4, num5{', num6' if config['numbers'] == 6 else ''}
-        FROM {table_name}
-        ORDER BY draw_term DESC
-        LIMIT ?
-    ''', [periods])
-    historical_draws = cursor.fetchall()
+    historical_draws = load_draw_window(lottery_type, periods).rows
     
     # 計算平均奇偶比例和大小比例
     odd_count = 0
@@ -233,7 +187,6 @@ def get_balanced_combinations(lottery_type, periods=50, count=5):
             }
         })
     
-    conn.close()
     return results
 
 def get_lucky_numbers(lottery_type, birth_date='', lucky_numbers=None, count=5):
@@ -320,33 +273,17 @@ def get_lucky_numbers(lottery_type, birth_date='', lucky_numbers=None, count=5):
 
 def get_missing_value_combinations(lottery_type, periods=50, count=5):
     """根據遺漏值分析推薦號碼組合"""
-    conn = sqlite3.connect('lottery.db')
-    cursor = conn.cursor()
     config = get_lottery_config(lottery_type)
     
-    table_name = {
-        'big-lotto': 'big_lotto',
-        'super-lotto': 'super_lotto',
-        'daily-cash': 'daily_cash'
-    }[lottery_type]
-    
-    # 獲取最近開出的號碼
-    cursor.execute(f'''
-        SELECT num1, num2, num3, num4, num5{', num6' if config['numbers'] == 6 else ''}
-        FROM {table_name}
-        ORDER BY draw_term DESC
-        LIMIT ?
-    ''', [periods])
-    recent_draws = cursor.fetchall()
+    # 獲取最近N期每個號碼出現的位置（由新到舊）
+    appearances = number_appearances(lottery_type, periods)
     
     # 計算每個號碼的遺漏值
     missing_values = {}
     for i in range(1, config['max_number'] + 1):
-        # 找出最後一次出現的位置
-        for idx, draw in enumerate(recent_draws):
-            if i in draw:
-                missing_values[i] = idx
-                break
+        if i in appearances:
+            # 最後一次出現的位置
+            missing_values[i] = appearances[i][0]
         else:
             # 如果在觀察期內都沒出現
             missing_values[i] = periods
@@ -376,29 +313,14 @@ def get_missing_value_combinations(lottery_type, periods=50, count=5):
             }
         })
     
-    conn.close()
     return results
 
 def get_periodic_combinations(lottery_type, periods=50, count=5):
     """根據週期性分析推薦號碼組合"""
-    conn = sqlite3.connect('lottery.db')
-    cursor = conn.cursor()
     config = get_lottery_config(lottery_type)
     
-    table_name = {
-        'big-lotto': 'big_lotto',
-        'super-lotto': 'super_lotto',
-        'daily-cash': 'daily_cash'
-    }[lottery_type]
-    
-    # 獲取最近開出的號碼
-    cursor.execute(f'''
-        SELECT num1, num2, num3, num4, num5{', num6' if config['numbers'] == 6 else ''}
-        FROM {table_name}
-        ORDER BY draw_term DESC
-        LIMIT ?
-    ''', [periods])
-    recent_draws = cursor.fetchall()
+    # 獲取最近N期每個號碼出現的位置（由新到舊）
+    number_positions = number_appearances(lottery_type, periods)
     
     # 分析每個號碼的出現週期
     number_periods = {}
@@ -407,12 +329,11 @@ def get_periodic_combinations(lottery_type, periods=50, count=5):
         last_appearance = None
         
         # 記錄每次出現的位置
-        for idx, draw in enumerate(recent_draws):
-            if i in draw:
-                if last_appearance is not None:
-                    period = idx - last_appearance
-                    appearances.append(period)
-                last_appearance = idx
+        for idx in number_positions.get(i, ()):
+            if last_appearance is not None:
+                period = idx - last_appearance
+                appearances.append(period)
+            last_appearance = idx
         
         # 計算平均週期和標準差
         if appearances:
@@ -462,7 +383,6 @@ def get_periodic_combinations(lottery_type, periods=50, count=5):
             }
         })
     
-    conn.close()
     return results
 
 def get_consecutive_combinations(lottery_type, count=5):
@@ -613,24 +533,10 @@ def get_symmetric_combinations(lottery_type, count=5):
 
 def get_high_frequency_combinations(lottery_type, periods=50, count=5):
     """生成高頻號碼組合推薦"""
-    conn = sqlite3.connect('lottery.db')
-    cursor = conn.cursor()
     config = get_lottery_config(lottery_type)
     
-    table_name = {
-        'big-lotto': 'big_lotto',
-        'super-lotto': 'super_lotto',
-        'daily-cash': 'daily_cash'
-    }[lottery_type]
-    
-    # 獲取最近開出的號碼
-    cursor.execute(f'''
-        SELECT num1, num2, num3, num4, num5{', num6' if config['numbers'] == 6 else ''}
-        FROM {table_name}
-        ORDER BY draw_term DESC
-        LIMIT ?
-    ''', [periods])
-    recent_draws = cursor.fetchall()
+    # 獲取最近N期每個號碼出現的位置（由新到舊）
+    number_positions = number_appearances(lottery_type, periods)
     
     # 分析每個號碼的出現頻率和週期
     number_stats = {}
@@ -640,13 +546,12 @@ def get_high_frequency_combinations(lottery_type, periods=50, count=5):
         frequency = 0
         
         # 記錄每次出現的位置和計算頻率
-        for idx, draw in enumerate(recent_draws):
-            if i in draw:
-                frequency += 1
-                if last_appearance is not None:
-                    period = idx - last_appearance
-                    appearances.append(period)
-                last_appearance = idx
+        for idx in number_positions.get(i, ()):
+            frequency += 1
+            if last_appearance is not None:
+                period = idx - last_appearance
+                appearances.append(period)
+            last_appearance = idx
         
         # 計算平均週期和頻率分數
         if appearances:
@@ -696,7 +601,6 @@ def get_high_frequency_combinations(lottery_type, periods=50, count=5):
             }
         })
     
-    conn.close()
     return results
 
 def get_golden_ratio_combinations(lottery_type, count=5):
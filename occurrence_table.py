@@ -0,0 +1,82 @@
+from functools import lru_cache
+import numpy as np
+from db import DB_PATH, dataset_version
+from draw_snapshot import load_snapshot
+from draw_window import LOTTERY_TABLES, load_draw_history
+
+class OccurrenceTable:
+    """各號碼的累計出現次數表（由舊到新），任意連續區間的出現次數為兩列相減"""
+
+    def __init__(self, terms, cumulative, last_index):
+        self.terms = np.asarray(terms, dtype=np.int64)
+        # cumulative[k][n] 為前 k 期中號碼 n 出現的次數，共 len(terms) + 1 列
+        self.cumulative = np.asarray(cumulative)
+        # last_index[n] 為號碼 n 最近一次開出的期數索引，未曾開出為 -1
+        self.last_index = np.asarray(last_index, dtype=np.int64)
+
+    @classmethod
+    def from_numbers(cls, terms, numbers, max_number):
+        """由開獎號碼矩陣（由舊到新）建立累計表"""
+        numbers = np.asarray(numbers, dtype=np.intp)
+        hits = np.zeros((len(numbers), max_number + 1), dtype=np.int32)
+        hits[np.arange(len(numbers))[:, None], numbers] = 1
+
+        cumulative = np.zeros((len(numbers) + 1, max_number + 1), dtype=np.int32)
+        np.cumsum(hits, axis=0, out=cumulative[1:])
+
+        # 反轉後以 argmax 找出每個號碼最後一次開出的位置
+        drawn = hits.any(axis=0)
+        if len(numbers):
+            last_index = np.where(drawn, len(numbers) - 1 - hits[::-1].argmax(axis=0), -1)
+        else:
+            last_index = np.full(max_number + 1, -1)
+        return cls([int(term) for term in terms], cumulative, last_index)
+
+    def __len__(self):
+        return len(self.terms)
+
+    def frequency(self, periods):
+        """最近 periods 期中每個號碼的出現次數"""
+        total = len(self)
+        start = max(0, total - max(0, periods))
+        return self.cumulative[total] - self.cumulative[start]
+
+    def range_frequency(self, start_term, end_term):
+        """期數介於 start_term 與 end_term（含）之間每個號碼的出現次數"""
+        start = np.searchsorted(self.terms, int(start_term), side='left')
+        end = np.searchsorted(self.terms, int(end_term), side='right')
+        return self.cumulative[max(start, end)] - self.cumulative[start]
+
+    def missing_periods(self, periods):
+        """最近 periods 期中每個號碼的遺漏期數，期間內未開出者為 periods"""
+        gap = len(self) - 1 - self.last_index
+        return np.where((self.last_index >= 0) & (gap < periods), gap, periods)
+
+    def last_drawn_term(self, number):
+        """號碼最近一次開出的期數，未曾開出則為 None"""
+        index = self.last_index[number]
+        return str(self.terms[index]) if index >= 0 else None
+
+def _read_occurrence_table(lottery_type, db_path):
+    # 累計表與欄位快照一起建立，陣列以記憶體映射讀取，各行程共用同一份頁面
+    snapshot = load_snapshot(lottery_type, db_path)
+    if snapshot is None or snapshot.cumulative is None:
+        return None
+    return OccurrenceTable(snapshot.term, snapshot.cumulative, snapshot.last_index)
+
+@lru_cache(maxsize=8)
+def _load_occurrence_table(lottery_type, db_path, version):
+    table = _read_occurrence_table(lottery_type, db_path)
+    if table is None:
+        # 欄位快照尚未建立或已過期，改由完整開獎歷史即時建立
+        history = load_draw_history(lottery_type, db_path)
+        table = OccurrenceTable.from_numbers(
+            history.terms[::-1], history.numbers[::-1], history.max_number
+        )
+    return table
+
+def load_occurrence_table(lottery_type, db_path=DB_PATH):
+    """取得彩種目前資料版本的累計出現次數表"""
+    if lottery_type not in LOTTERY_TABLES:
+        lottery_type = 'daily-cash'
+    return _load_occurrence_table(lottery_type, db_path, dataset_version(db_path))
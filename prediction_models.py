@@ -1,67 +1,120 @@
+import os
+import pickle
 import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import StandardScaler
 from datetime import datetime
-import sqlite3
+from db import DB_PATH, read_connection
+from draw_snapshot import load_snapshot
 import logging
 
 logger = logging.getLogger(__name__)
 
+def snapshot_frame(lottery_type, periods):
+    """由欄位快照建立最近 periods 期（由新到舊）的資料表，欄位與 prepare_data 的查詢結果相同，快照不可用時為 None"""
+    snapshot = load_snapshot(lottery_type)
+    if snapshot is None:
+        return None
+
+    # 快照由舊到新，取最後 periods 期後反轉
+    count = len(snapshot) if periods < 0 else min(periods, len(snapshot))
+    start = len(snapshot) - count
+    days = snapshot.day[start:][::-1].astype(np.int64)
+    dates = days.astype('datetime64[D]')
+    columns = {
+        'draw_term': [str(term) for term in snapshot.term[start:][::-1].tolist()],
+        'draw_day': days,
+        'year': dates.astype('datetime64[Y]').astype(np.int64) + 1970,
+        'month': dates.astype('datetime64[M]').astype(np.int64) % 12 + 1,
+        # 1970-01-01 為星期四，星期一為 0
+        'weekday': (days + 3) % 7
+    }
+    numbers = snapshot.numbers[start:][::-1]
+    for i in range(numbers.shape[1]):
+        columns[f'num{i + 1}'] = numbers[:, i].astype(np.int64)
+    if lottery_type == 'super-lotto':
+        columns['special_num'] = snapshot.special[start:][::-1].astype(np.int64)
+    return pd.DataFrame(columns)
+
+def model_path(db_path=DB_PATH):
+    """訓練好的模型與資料庫放在同一個目錄"""
+    return os.path.splitext(db_path)[0] + '.model.pkl'
+
+def _file_version(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
 class LotteryPredictor:
     def __init__(self):
         self.rf_model = None
         self.scaler = StandardScaler()
+        # 目前使用的模型檔版本
+        self._model_version = None
+
+    def save(self, path=None):
+        """將訓練好的模型寫入檔案，多個 worker 時其他 worker 預測時讀取同一份模型"""
+        path = path or model_path()
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as fp:
+            pickle.dump({'rf_model': self.rf_model, 'scaler': self.scaler}, fp)
+        os.replace(temp_path, path)
+        self._model_version = _file_version(path)
+
+    def refresh(self, path=None):
+        """模型檔比目前使用的模型新時重新讀取，回傳是否有可用的模型"""
+        path = path or model_path()
+        version = _file_version(path)
+        if version is not None and version != self._model_version:
+            try:
+                with open(path, 'rb') as fp:
+                    model = pickle.load(fp)
+                self.rf_model, self.scaler = model['rf_model'], model['scaler']
+                self._model_version = version
+            except (OSError, EOFError, pickle.UnpicklingError, KeyError) as e:
+                logger.warning(f'讀取模型檔 {path} 失敗: {str(e)}')
+        return self.rf_model is not None
         
     def prepare_data(self, lottery_type, periods=1000):
         """準備訓練資料"""
         try:
-            conn = sqlite3.connect('lottery.db')
-            table_name = {
-                'big-lotto': 'big_lotto',
-                'super-lotto': 'super_lotto',
-                'daily-cash': 'daily_cash'
-            }[lottery_type]
-            
-            # 修改 SQL 查詢以包含特別號
-            query = f"""
-                SELECT 
-                    draw_term,
-                    CASE 
-                        WHEN draw_date LIKE '%/%/%' THEN 
-                            CAST(substr(draw_date, 1, instr(draw_date, '/') - 1) AS INTEGER) + 1911 || 
-                            '-' || 
-                            substr(draw_date, instr(draw_date, '/') + 1, 2) || 
-                            '-' || 
-                            substr(draw_date, -2)
-                        WHEN draw_date LIKE '%-%-%' THEN
-                            CAST(substr(draw_date, 1, instr(draw_date, '-') - 1) AS INTEGER) + 1911 || 
-                            '-' || 
-                            substr(draw_date, instr(draw_date, '-') + 1, 2) || 
-                            '-' || 
-                            substr(draw_date, -2)
-                        ELSE draw_date
-                    END as draw_date,
-                    num1, num2, num3, num4, num5
-                    {', num6' if lottery_type != 'daily-cash' else ''}
-                    {', special_num' if lottery_type == 'super-lotto' else ''}
-                FROM {table_name}
-                ORDER BY draw_term DESC
-                LIMIT {periods}
-            """
-            
-            df = pd.read_sql_query(query, conn)
-            conn.close()
-            
-            # 確保日期格式正確
-            df['draw_date'] = pd.to_datetime(df['draw_date'])
+            # 優先讀取匯入時產生的欄位快照，快照不可用時才查詢資料庫
+            df = snapshot_frame(lottery_type, periods)
+            if df is None:
+                table_name = {
+                    'big-lotto': 'big_lotto',
+                    'super-lotto': 'super_lotto',
+                    'daily-cash': 'daily_cash'
+                }[lottery_type]
+                
+                # 修改 SQL 查詢以包含特別號，日期欄位已在匯入時換算完成
+                query = f"""
+                    SELECT 
+                        draw_term,
+                        draw_day,
+                        draw_year AS year,
+                        draw_month AS month,
+                        draw_weekday AS weekday,
+                        num1, num2, num3, num4, num5
+                        {', num6' if lottery_type != 'daily-cash' else ''}
+                        {', special_num' if lottery_type == 'super-lotto' else ''}
+                    FROM {table_name}
+                    ORDER BY draw_day DESC
+                    LIMIT {periods}
+                """
+                
+                with read_connection() as conn:
+                    df = pd.read_sql_query(query, conn)
+            
+            # 開獎日數為 1970-01-01 起算的日數
+            df['draw_date'] = pd.to_datetime(df['draw_day'], unit='D')
             
             # 特徵工程
-            df['year'] = df['draw_date'].dt.year
-            df['month'] = df['draw_date'].dt.month
             df['day'] = df['draw_date'].dt.day
-            df['weekday'] = df['draw_date'].dt.weekday
             
             # 添加更多特徵
             df['year_mod'] = df['year'] % 10  # 年份的餘數
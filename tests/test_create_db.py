@@ -0,0 +1,92 @@
+import io
+import os
+import sys
+import shutil
+import unittest
+import contextlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from crawler_benchmark import workspace
+from db import dataset_version, open_writer
+from draw_archive import open_archive, import_json
+import create_db
+
+FIXTURES = os.path.join(ROOT, 'tests', 'data')
+
+def run_import():
+    """匯入大樂透，回傳 (新增期數, 輸出訊息)"""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        added = create_db.import_data(['big_lotto'])
+    return added['big_lotto'], output.getvalue()
+
+def table_rows():
+    conn = open_writer('lottery.db')
+    rows = conn.execute(f'SELECT {create_db.ROW_COLUMNS["big_lotto"]} FROM big_lotto ORDER BY draw_term').fetchall()
+    conn.close()
+    return rows
+
+def archive_rows():
+    return sorted(create_db.draw_to_row('big_lotto', draw) for draw in open_archive(os.path.join('data', 'BigLotto')).draws())
+
+class ImportDataTest(unittest.TestCase):
+    """依月份摘要同步封存檔與數據庫"""
+
+    def setUp(self):
+        self._workspace = workspace(with_data=False)
+        self._workspace.__enter__()
+        shutil.copy(os.path.join(FIXTURES, 'BigLotto.json'), 'BigLotto.json')
+        import_json('BigLotto.json', os.path.join('data', 'BigLotto'))
+        self.draws = open_archive(os.path.join('data', 'BigLotto')).draws()
+        self.assertEqual(run_import()[0], len(self.draws))
+
+    def tearDown(self):
+        self._workspace.__exit__(None, None, None)
+
+    def rewrite_archive(self, draws):
+        open_archive(os.path.join('data', 'BigLotto')).create(draws)
+
+    def test_unchanged_archive_is_skipped(self):
+        version = dataset_version('lottery.db')
+        added, output = run_import()
+        self.assertEqual(added, 0)
+        self.assertIn('資料未變動', output)
+        self.assertEqual(dataset_version('lottery.db'), version)
+
+    def test_changed_month(self):
+        changed = dict(self.draws[-1], price=self.draws[-1]['price'] + 1)
+        self.rewrite_archive(self.draws[:-1] + [changed])
+
+        added, output = run_import()
+        self.assertEqual(added, 0)
+        self.assertIn('同步 1 個月份', output)
+        self.assertEqual(table_rows(), archive_rows())
+
+    def test_removed_term(self):
+        removed = self.draws[3]
+        self.rewrite_archive([draw for draw in self.draws if draw is not removed])
+
+        added, output = run_import()
+        self.assertEqual(added, 0)
+        self.assertIn('移除期數: big_lotto 1 筆', output)
+        self.assertNotIn(removed['draw'], [row[0] for row in table_rows()])
+        self.assertEqual(table_rows(), archive_rows())
+
+    def test_digest_bootstrap(self):
+        # 尚未記錄摘要的資料庫，其中一個月份與封存檔不同
+        conn = open_writer('lottery.db')
+        conn.execute('DELETE FROM draw_digests')
+        conn.execute('UPDATE big_lotto SET total_sales = 0 WHERE draw_term = ?', (self.draws[0]['draw'],))
+        conn.commit()
+        conn.close()
+
+        added, output = run_import()
+        self.assertIn('同步 1 個月份', output)
+        self.assertEqual(table_rows(), archive_rows())
+        self.assertIn('資料未變動', run_import()[1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import io
+import os
+import sys
+import contextlib
+import json
+import shutil
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from fake_lottery_api import FakeLotteryAPI
+from crawler_benchmark import workspace, quiet
+from draw_archive import open_archive, export_json, import_json
+import Lotto_Crawler
+
+class GapsTest(unittest.TestCase):
+    """缺少期數的偵測與補抓"""
+
+    def test_missing_trailing_term(self):
+        with FakeLotteryAPI(latency=0) as api, workspace():
+            archive = open_archive(os.path.join('data', 'DailyCash'))
+            draws = archive.draws()
+            removed = [draw for draw in draws if draw['year'] == 112][-1]
+            archive.create([draw for draw in draws if draw is not removed])
+
+            archive = open_archive(os.path.join('data', 'DailyCash'))
+            self.assertEqual(archive.gaps(), {})
+            self.assertIn((112, removed['month']), archive.trailing_months())
+
+            lotto = Lotto_Crawler.DailyCash(api=api.url('Daily539Result'), use_cache=False).load()
+            with quiet():
+                lotto.repair()
+            self.assertEqual([draw['draw'] for draw in lotto.new_draws], [removed['draw']])
+
+    def test_complete_archive(self):
+        with FakeLotteryAPI(latency=0) as api, workspace():
+            with quiet():
+                Lotto_Crawler.BigLotto(api=api.url('Lotto649Result')).load().repair()
+            self.assertGreater(api.counts['requests'], 0)
+
+            # 年底月份已有月份結束後的回應快取，完整的封存不再重新爬取
+            api.reset_counts()
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                lotto = Lotto_Crawler.BigLotto(api=api.url('Lotto649Result')).load().repair()
+            self.assertIn('沒有缺少的期數', output.getvalue())
+            self.assertEqual(api.counts['requests'], 0)
+            self.assertEqual(lotto.new_draws, [])
+
+    def test_missing_year_shard(self):
+        with workspace():
+            archive = open_archive(os.path.join('data', 'BigLotto'))
+            archive.create([draw for draw in archive.draws() if draw['year'] != 110])
+
+            gaps = open_archive(os.path.join('data', 'BigLotto')).gaps()
+            for month in range(1, 13):
+                self.assertIn((110, month), gaps)
+
+FIXTURES = os.path.join(ROOT, 'tests', 'data')
+
+class ImportJsonTest(unittest.TestCase):
+    """由 JSON 資料檔匯入封存"""
+
+    def test_round_trip(self):
+        # 由舊版 JSON 資料檔節錄的跨年度期數，轉為封存紀錄後再還原與匯出，內容不變
+        with workspace(with_data=False):
+            for name in ['BigLotto', 'SuperLotto', 'DailyCash']:
+                with open(os.path.join(FIXTURES, f'{name}.json'), 'r', encoding='utf-8') as fp:
+                    expected = json.load(fp)
+                shutil.copy(os.path.join(FIXTURES, f'{name}.json'), 'source.json')
+
+                archive = import_json('source.json', os.path.join('data', name))
+                self.assertEqual(archive.years(), [112, 113])
+                draws = open_archive(os.path.join('data', name)).draws()
+                self.assertEqual([draw['draw'] for draw in draws], sorted(expected, key=int))
+                self.assertEqual({draw['draw']: draw for draw in draws}, expected)
+
+                with open(export_json(os.path.join('data', name)), 'r', encoding='utf-8') as fp:
+                    self.assertEqual(json.load(fp), expected)
+
+    def test_import_keeps_newer_draws(self):
+        with workspace():
+            path = os.path.join('data', 'BigLotto')
+            draws = open_archive(path).draws()
+            # 匯出後封存又多了新期數，JSON 停在較舊的期數
+            archive = open_archive(path)
+            archive.create(draws[:-3])
+            json_path = export_json(path)
+            archive.append(draws[-3:])
+
+            import_json(json_path, path)
+            self.assertEqual(open_archive(path).draws(), draws)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import sys
+import unittest
+from datetime import datetime
+from functools import partial
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from fake_lottery_api import FakeLotteryAPI
+from crawler_benchmark import workspace, quiet
+from db import open_writer
+from draw_archive import open_archive
+from draw_scheduler import DrawScheduler, TAIPEI
+import Lotto_Crawler
+
+def remove_month(archive_name, table, month):
+    """從封存檔與數據庫移除 month 起的所有期數，回傳被移除的期數"""
+    archive = open_archive(os.path.join('data', archive_name))
+    draws = archive.draws()
+    removed = [draw for draw in draws if (draw['year'], draw['month']) >= month]
+    archive.create([draw for draw in draws if (draw['year'], draw['month']) < month])
+    conn = open_writer('lottery.db')
+    conn.executemany(f'DELETE FROM {table} WHERE draw_term = ?', [(draw['draw'],) for draw in removed])
+    conn.commit()
+    conn.close()
+    return removed
+
+def count_month(table, month):
+    conn = open_writer('lottery.db')
+    count = conn.execute(f"SELECT COUNT(*) FROM {table} WHERE draw_date LIKE ?", (month + '/%',)).fetchone()[0]
+    conn.close()
+    return count
+
+class MonthBoundaryTest(unittest.TestCase):
+    """最新一期在上個月時，排程仍能取得本月的新期數"""
+
+    def test_poll_crosses_month_boundary(self):
+        with FakeLotteryAPI(latency=0) as api, workspace():
+            # 移除大樂透 114/02 的所有期數，最新一期停在 114/01
+            removed = remove_month('BigLotto', 'big_lotto', (114, 2))
+
+            games = [('大樂透', partial(Lotto_Crawler.BigLotto, api=api.url('Lotto649Result'), use_cache=False), 'big_lotto')]
+            # 114/02/04（星期二）開獎後
+            now = datetime(2025, 2, 4, 21, 0, tzinfo=TAIPEI)
+            scheduler = DrawScheduler(games=games, now=lambda: now)
+            with quiet():
+                found = scheduler.poll('big_lotto')
+
+            self.assertTrue(found)
+            self.assertEqual(open_archive(os.path.join('data', 'BigLotto')).last_term(), removed[-1]['draw'])
+            self.assertEqual(count_month('big_lotto', '114/02'), len(removed))
+
+    def test_failed_ingest_catches_up(self):
+        with FakeLotteryAPI(latency=0) as api, workspace():
+            removed = remove_month('BigLotto', 'big_lotto', (114, 2))
+            games = [('大樂透', partial(Lotto_Crawler.BigLotto, api=api.url('Lotto649Result'), use_cache=False), 'big_lotto')]
+            now = datetime(2025, 2, 4, 21, 0, tzinfo=TAIPEI)
+
+            # 新期數已寫入封存檔，寫入數據庫時失敗
+            scheduler = DrawScheduler(games=games, now=lambda: now)
+            with quiet(), mock.patch('create_db.ingest_draws', side_effect=OSError('disk full')):
+                self.assertFalse(scheduler.poll('big_lotto'))
+            self.assertEqual(open_archive(os.path.join('data', 'BigLotto')).last_term(), removed[-1]['draw'])
+
+            # 下一次檢查時封存檔沒有新期數，仍補寫數據庫缺少的期數
+            with quiet():
+                self.assertTrue(scheduler.poll('big_lotto'))
+            self.assertEqual(count_month('big_lotto', '114/02'), len(removed))
+
+    def test_crawl_reports_up_to_date(self):
+        with FakeLotteryAPI(latency=0) as api, workspace():
+            lotto = Lotto_Crawler.BigLotto(api=api.url('Lotto649Result'), use_cache=False).load()
+            with quiet():
+                lotto.crawl(until=datetime(2025, 2, 28, 21, 0, tzinfo=TAIPEI))
+            self.assertEqual(lotto.new_draws, [])
+            self.assertEqual(api.counts['requests'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
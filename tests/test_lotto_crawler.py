@@ -0,0 +1,54 @@
+import os
+import sys
+import unittest
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from fake_lottery_api import FakeLotteryAPI
+from crawler_benchmark import workspace, quiet
+from draw_scheduler import TAIPEI
+import Lotto_Crawler
+
+class ResponseCacheTest(unittest.TestCase):
+    """已結束月份的回應快取"""
+
+    def test_probe_revalidates_closed_month(self):
+        with FakeLotteryAPI(latency=0) as api, workspace():
+            until = datetime(2025, 2, 28, 21, 0, tzinfo=TAIPEI)
+            with quiet():
+                Lotto_Crawler.BigLotto(api=api.url('Lotto649Result')).load().crawl(until=until)
+            self.assertTrue(Lotto_Crawler.BigLotto().cache.get(114, 2)['immutable'])
+
+            # 最新一期所在的月份已存入快取，檢查新期數時仍向伺服器確認
+            api.reset_counts()
+            with quiet():
+                Lotto_Crawler.BigLotto(api=api.url('Lotto649Result')).load().crawl(until=until)
+            self.assertEqual(api.counts['requests'], 1)
+            self.assertEqual(api.counts['not_modified'], 1)
+
+    def test_not_modified_promotes_closed_month(self):
+        with FakeLotteryAPI(latency=0) as api, workspace():
+            lotto = Lotto_Crawler.BigLotto(api=api.url('Lotto649Result'))
+            with quiet():
+                content = lotto.crawlApi(114, 1)
+            # 模擬月份尚未結束時存入的快取
+            cached = lotto.cache.get(114, 1)
+            lotto.cache.put(114, 1, content, False, cached['etag'], cached['last_modified'])
+
+            lotto = Lotto_Crawler.BigLotto(api=api.url('Lotto649Result'))
+            with quiet():
+                lotto.crawlApi(114, 1)
+            self.assertEqual(api.counts['not_modified'], 1)
+            self.assertTrue(lotto.cache.get(114, 1)['immutable'])
+
+            api.reset_counts()
+            lotto = Lotto_Crawler.BigLotto(api=api.url('Lotto649Result'))
+            with quiet():
+                lotto.crawlApi(114, 1)
+            self.assertEqual(api.counts['requests'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,27 @@
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from crawler_benchmark import workspace
+from prediction_models import LotteryPredictor
+
+class SharedModelTest(unittest.TestCase):
+    """訓練與預測由不同 worker 處理時使用同一份模型"""
+
+    def test_other_predictor_uses_saved_model(self):
+        with workspace():
+            trained = LotteryPredictor()
+            trained.train_models('big-lotto', 200)
+            other = LotteryPredictor()
+            self.assertFalse(other.refresh())
+
+            trained.save()
+            self.assertTrue(other.refresh())
+            self.assertEqual(other.predict_next_draw('big-lotto'), trained.predict_next_draw('big-lotto'))
+
+if __name__ == '__main__':
+    unittest.main()